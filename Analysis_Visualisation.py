@@ -4,18 +4,21 @@ This file contains the visualisation and analysis codes
 
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
 import numpy as np
 import plotly.graph_objects as go
 import re
-import ast
+import io
+import base64
 from collections import defaultdict
 from sklearn.linear_model import LinearRegression
-import json
 import dash_bootstrap_components as dbc
 from wordcloud import WordCloud
 from scipy import stats
 import warnings
+from dataset_store import load_dataset
+from chart_render import render_chart
+from artifact_store import read_artifact
+from dataset_store import get_partition_index, get_skill_index
 
 # Cleaning salary column
 def clean_salary_column(salary_column):
@@ -41,22 +44,8 @@ def clean_salary_column(salary_column):
     return salary_column.apply(clean_salary_value)
 
 def load_data(file_path):
-    data = pd.read_csv(file_path) #load file 
-    data['Min Salary (K)'] = pd.to_numeric(data['Min Salary (K)'], errors='coerce') # coerce to convert the specifed columns into the same data type
-
-    data['Max Salary (K)'] = pd.to_numeric(data['Max Salary (K)'], errors='coerce')
-
-    # Convert 'Job Posting Date' to datetime format
-    # 'errors="coerce"' will convert invalid parsing to NaT (not-a-time)
-    data['Job Posting Date'] = pd.to_datetime(data['Job Posting Date'], errors='coerce')
-
-    # Create 'Year-Quarter' field by converting 'Job Posting Date' to year-quarter format
-    data['Year-Quarter'] = data['Job Posting Date'].dt.to_period('Q').astype(str)
-
-    # Calculate Average Salary for each jon title
-    data['Average Salary (K)'] = (data['Min Salary (K)'] + data['Max Salary (K)']) / 2
-
-    return data
+    # Parsing and type conversion live in the dataset store so every caller gets the same dtypes
+    return load_dataset(file_path)
 
 def analyse_industry_distribution(data):
     # Group the data by 'Broader Category' to get job distribution
@@ -73,11 +62,14 @@ def analyse_industry_distribution(data):
     Bigger the bubble size, higher the count of the job title.
     Data columns such as Broader Catergory, Job title were being used
 '''
-def create_job_title_bubble_chart(data, industry_name_orig, json_file="analysis/job_title_bubble_chart.json"):
+def create_job_title_bubble_chart(data, industry_name_orig, partitions=None):
+    if partitions is None:
+        partitions = get_partition_index()
 
     # -- ANALYSIS -- 
-    # Filter data for the selected 'Broader Category'
-    industry_data = data[data['Broader Category'] == industry_name_orig]
+    # Take the rows of the selected 'Broader Category'
+    start, stop = partitions.industry_range(industry_name_orig)
+    industry_data = data.iloc[start:stop]
 
     # Count the frequency of each job title in the selected industry
     job_title_counts = industry_data['Job Title'].value_counts().reset_index()
@@ -87,7 +79,7 @@ def create_job_title_bubble_chart(data, industry_name_orig, json_file="analysis/
 
     # Create a DataFrame for the bubble chart
     job_title_df = pd.DataFrame({
-        'Job Title': job_title_counts['Job Title'],
+        'Job Title': job_title_counts['Job Title'].astype(str),
         'Bubble Size': job_title_counts['Job Count'] * 2,  # Increase bubble size proportional to the frequency
         'x': np.random.rand(len(job_title_counts)) * 100,  # Spread out x values more widely
         'y': np.random.rand(len(job_title_counts)) * 100   # Spread out y values more widely
@@ -119,16 +111,8 @@ def create_job_title_bubble_chart(data, industry_name_orig, json_file="analysis/
                       margin=dict(l=20, r=20, t=40, b=80),
                       clickmode='event+select')  # Enable click events
 
-    # Convert the chart to HTML
-    html_code = fig.to_html(full_html=False)
-
-    # Save the chart to a JSON file
-    json_dict = {}
-    json_dict[industry_name_orig] = html_code
-
-    with open(json_file, "w") as file:
-        json.dump(json_dict, file)
-
+    # Convert the chart to a div with its figure JSON
+    html_code = render_chart(fig)
     return html_code
 
 #  ------------ Start of Salary Variation Boxplot  -------------------
@@ -138,21 +122,20 @@ Salary variation chart is a box plot that show the median, mean salaries of jobs
 data columns such as Broader Catergory, Job title, Average Salary (K).
 '''
 
-def create_salary_variation_chart(data, industry_name_orig):
+def create_salary_variation_chart(data, industry_name_orig, partitions=None):
+    if partitions is None:
+        partitions = get_partition_index()
 
     #  -- ANALYSIS --
-    # Filter data for the selected industry
-    industry_data = data[data['Broader Category'] == industry_name_orig]
-
-    # Get all unique job titles
-    job_titles = industry_data['Job Title'].unique()
+    # Get the row range of every job title in the selected industry
+    job_titles = partitions.title_ranges(industry_name_orig)
 
     # -- VISUALISAITON -- Create the box plot
     fig = go.Figure()
 
     # Plot the first 5 job titles and show them by default
-    for i, job_title in enumerate(job_titles[:5]):
-        job_data = industry_data[industry_data['Job Title'] == job_title]
+    for i, (job_title, start, stop) in enumerate(job_titles[:5]):
+        job_data = data.iloc[start:stop]
         fig.add_trace(go.Box(
             y=job_data['Average Salary (K)'],
             name=job_title,
@@ -163,8 +146,8 @@ def create_salary_variation_chart(data, industry_name_orig):
         ))
 
     # Plot the rest of the job titles but keep them hidden initially
-    for i, job_title in enumerate(job_titles[5:], start=5):
-        job_data = industry_data[industry_data['Job Title'] == job_title]
+    for i, (job_title, start, stop) in enumerate(job_titles[5:], start=5):
+        job_data = data.iloc[start:stop]
         fig.add_trace(go.Box(
             y=job_data['Average Salary (K)'],
             name=job_title,
@@ -182,8 +165,8 @@ def create_salary_variation_chart(data, industry_name_orig):
         clickmode='event+select'
     )
 
-    # Return the box plot as HTML code
-    html_code = fig.to_html(full_html=False)
+    # Return the box plot as a div with its figure JSON
+    html_code = render_chart(fig)
     return html_code
 
 #  ------------ Start of Salary Trend Line Graph  -------------------
@@ -193,13 +176,17 @@ Salary trend graph is a line chart that shows the avergae salary of the all the
 Data columns used are Broader Category, Job Title, Year-Quarter and Average Salary (K)
 '''
 
-def create_salary_trend_chart(data, industry_name_orig):
+def create_salary_trend_chart(data, industry_name_orig, partitions=None):
+    if partitions is None:
+        partitions = get_partition_index()
+
     # -- ANALYSIS --
-    # Filter data for the selected industry
-    industry_data = data[data['Broader Category'] == industry_name_orig]
+    # Take the rows of the selected industry
+    start, stop = partitions.industry_range(industry_name_orig)
+    industry_data = data.iloc[start:stop]
 
     # Group by Job Title and Year-Quarter, then calculate average salary
-    salary_trend = industry_data.groupby(['Job Title', 'Year-Quarter'])['Average Salary (K)'].mean().reset_index()
+    salary_trend = industry_data.groupby(['Job Title', 'Year-Quarter'], observed=True)['Average Salary (K)'].mean().reset_index()
 
     # Separate 'Year-Quarter' into 'Year' and 'Quarter' for proper sorting
     salary_trend['Year'] = salary_trend['Year-Quarter'].str[:4].astype(int)
@@ -211,11 +198,10 @@ def create_salary_trend_chart(data, industry_name_orig):
     # -- VISUALISATION --
     fig = go.Figure()
 
-    job_titles = salary_trend['Job Title'].unique()
     colors = px.colors.qualitative.Plotly
 
-    for i, job_title in enumerate(job_titles):
-        job_data = salary_trend[salary_trend['Job Title'] == job_title]
+    # Split the trend by job title in one pass, in order of first appearance
+    for i, (job_title, job_data) in enumerate(salary_trend.groupby('Job Title', observed=True, sort=False)):
         color = colors[i % len(colors)]  # Use a consistent color for both lines
 
         # Add actual salary line
@@ -287,8 +273,8 @@ def create_salary_trend_chart(data, industry_name_orig):
         )
     )
 
-    # Convert the figure to HTML
-    html_code = fig.to_html(full_html=False)
+    # Convert the figure to a div with its figure JSON
+    html_code = render_chart(fig)
     return html_code
 
 #  ------------ Start of Salary Growth Line Graph  -------------------
@@ -298,17 +284,20 @@ Salary Growth Graph shows the prediction trend of the job title's salary for the
 Data columns used are Braoder Category, Job title, Job Minimum Experience and Average Salary (K).
 '''
 
-def create_salary_growth_chart(data, industry_name_orig):
+def create_salary_growth_chart(data, industry_name_orig, partitions=None):
+    if partitions is None:
+        partitions = get_partition_index()
 
     # -- ANALYSIS --
-    # Filter data for the selected industry
-    industry_data = data[data['Broader Category'] == industry_name_orig]
+    # Take the rows of the selected industry
+    start, stop = partitions.industry_range(industry_name_orig)
+    industry_data = data.iloc[start:stop]
 
     # Group data by both Job Title and Job Minimum Experience and calculate the average salary
-    experience_salary = industry_data.groupby(['Job Title', 'Job Minimum Experience'])['Average Salary (K)'].mean().reset_index()
+    experience_salary = industry_data.groupby(['Job Title', 'Job Minimum Experience'], observed=True)['Average Salary (K)'].mean().reset_index()
 
     # Filter out job titles that have only one entry
-    job_title_counts = experience_salary.groupby('Job Title').size().reset_index(name='counts')
+    job_title_counts = experience_salary.groupby('Job Title', observed=True).size().reset_index(name='counts')
     job_titles_with_more_than_one = job_title_counts[job_title_counts['counts'] > 1]['Job Title']
 
     # Filter the data to include only those job titles
@@ -321,10 +310,10 @@ def create_salary_growth_chart(data, industry_name_orig):
         filtered_df = df[df['z_score'].abs() <= 2]
         return filtered_df
     
-    experience_salary_filtered = experience_salary_filtered.groupby('Job Title').apply(remove_anomalies).reset_index(drop=True)
+    experience_salary_filtered = experience_salary_filtered.groupby('Job Title', observed=True).apply(remove_anomalies).reset_index(drop=True)
 
     # Sort job titles by maximum salary and include all job titles that meet the criteria
-    job_titles_sorted = experience_salary_filtered.groupby('Job Title')['Average Salary (K)'].max().sort_values(ascending=False).index
+    job_titles_sorted = experience_salary_filtered.groupby('Job Title', observed=True)['Average Salary (K)'].max().sort_values(ascending=False).index
 
     # -- VISUALISATION -- Create a line chart for Salary Growth by Experience for each job title
     fig = go.Figure()
@@ -332,8 +321,11 @@ def create_salary_growth_chart(data, industry_name_orig):
     # Define some colors for consistency
     colors = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A']
 
+    # Split the filtered data by job title in one pass
+    job_title_groups = dict(tuple(experience_salary_filtered.groupby('Job Title', observed=True)))
+
     for i, job_title in enumerate(job_titles_sorted):
-        job_data = experience_salary_filtered[experience_salary_filtered['Job Title'] == job_title]
+        job_data = job_title_groups[job_title]
         color = colors[i % len(colors)]  # Color for both growth and prediction lines
 
         # Add the actual salary line for the job title
@@ -396,8 +388,8 @@ def create_salary_growth_chart(data, industry_name_orig):
         )
     )
 
-    # Convert the figure to HTML and return
-    html_code = fig.to_html(full_html=False)
+    # Convert the figure to a div with its figure JSON and return
+    html_code = render_chart(fig)
     return html_code
 # ---------------------------------------------------------------------------
 
@@ -409,9 +401,8 @@ Skills Comparison donut chart to show the comparison of skills that the user is
 '''
 
 def skills_comparison(userSkills, job_type, industry, top_searches=10):
-    # Load the JSON data
-    with open(f'analysis/job_role_skill_{industry}.json', 'r') as f:
-        data = json.load(f)
+    # Load the job role skills of the industry from the analysis artifacts
+    data = read_artifact(f'job_role_skill_{industry}')
 
     # Convert user skills to lowercase for case-insensitive comparison
     userSkillLowerCase = [skill.lower() for skill in userSkills]
@@ -454,8 +445,8 @@ def skills_comparison(userSkills, job_type, industry, top_searches=10):
         height=600
     )
 
-    # Return the HTML representation of the chart along with matched and missing skills
-    return fig.to_html(), missing_skills, matched_skills
+    # Return the chart div along with matched and missing skills
+    return render_chart(fig), missing_skills, matched_skills
 
 # ---------------------------------------------------------------------------
 
@@ -465,10 +456,10 @@ Author: Ryan Wong
 World cloud chart to show the comparison of in trend jobs based on their frequency count and differences are showed by the sizes of different job titles
 '''
 
-def generate_wordcloud(industry):
-    # Load data from JSON file
-    with open('analysis/industry_Jobs.json', 'r') as f:
-        data = json.load(f)
+def generate_wordcloud(industry, version=None, data=None):
+    # Load the job title counts from the analysis artifacts unless they were passed in
+    if data is None:
+        data = read_artifact('industry_Jobs', version)
     
     # Replace underscores with spaces in the industry name
     industryName = industry.replace("_", " ")
@@ -486,9 +477,14 @@ def generate_wordcloud(industry):
     # Generate the word cloud
     wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(word_dict)
     
+    # Encode the word cloud as a PNG, which is far smaller than sending the raw pixel array as JSON
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    image_source = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
     # Create a Plotly figure
     fig = go.Figure()
-    fig.add_trace(go.Image(z=wordcloud.to_array()))
+    fig.add_trace(go.Image(source=image_source))
     
     # Update layout for better display
     fig.update_layout(
@@ -501,7 +497,7 @@ def generate_wordcloud(industry):
         plot_bgcolor="white"
     )
     
-    return pio.to_html(fig, full_html=False)
+    return render_chart(fig)
 
 # ---------------------------------------------------------------------------
 
@@ -511,10 +507,13 @@ Author: Zheng yang
 Generate an interactive pie chart visualization showing the percentage demand of skills per year
 '''
 
-def skill_in_demand(job_role_df):
-    # Convert date and eval skills
+def skill_in_demand(job_role_df, skill_index=None):
+    # Integer encoded skills, rows are the index labels of the shared dataset
+    if skill_index is None:
+        skill_index = get_skill_index()
+
+    # Convert date
     job_role_df['Job Posting Date'] = pd.to_datetime(job_role_df['Job Posting Date'], format="%Y-%m-%d")
-    job_role_df["skills"] = job_role_df["skills"].apply(ast.literal_eval)
 
     # Sort by Job Posting Date
     job_role_df.sort_values(by="Job Posting Date", inplace=True, ascending=True)
@@ -526,7 +525,7 @@ def skill_in_demand(job_role_df):
     # Prepare data for each year
     for year in years:
         year_df = job_role_df[job_role_df["Job Posting Date"].dt.to_period("Y") == year]
-        skill_per_year = year_df["skills"].explode().value_counts()
+        skill_per_year = pd.Series(skill_index.top_skills(year_df.index.to_numpy()), dtype="int64")
 
         # calculate percentage of skill count of over total skill count of the year
         total_count = skill_per_year.values.sum()
@@ -585,6 +584,6 @@ def skill_in_demand(job_role_df):
         width=1000,  # Adjust width
         height=800  # Adjust height
     )
-    return fig.to_html()
+    return render_chart(fig)
 
 # ---------------------------------------------------------------------------
\ No newline at end of file
@@ -10,6 +10,7 @@ import re
 import pandas as pd
 import os
 import ast
+from dataset_store import write_columnar_dataset
 
 
 # ---------  Define a mapping between the 30 clusters and the new categories ----------------------------
@@ -528,6 +529,10 @@ flask_dataset_folder = r"Datasets"
 
 convert_df_list_to_csv(df_list, flask_dataset_folder)
 print("Individual industry csv files created!")
+
+# Write the typed Parquet copy of the dataset that the web app loads
+write_columnar_dataset('Datasets/sg_job_data_cleaned.csv')
+print("Columnar dataset created!")
 # -----------------------------------------------------------------------------
 
 
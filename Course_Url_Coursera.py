@@ -1,45 +1,186 @@
 '''
 Author: Ryan Wong
-Uses the coursera API to get courses links based on which course the user is lacking 
+Uses the coursera API to get courses links based on which course the user is lacking
+
+The skills are looked up concurrently on a small thread pool sharing one pooled HTTP
+session, so the connection to Coursera is reused and the lookups overlap instead of
+running one after another. Every call has its own timeout and the whole search has a
+deadline, skills whose lookup failed or did not answer in time are left out of the
+result instead of failing the page.
+
+Results are kept in the course cache on disk, so a skill is only looked up on Coursera
+when its entry is missing. An expired entry is still answered from the cache while it is
+refreshed in the background, and searches that found nothing are remembered for a while.
+Background refreshes run on their own small pool and are skipped while MAX_REFRESHES are
+already waiting, and lookups that had not started by the search deadline are cancelled,
+so a slow Coursera never builds up a queue that later searches wait behind.
+
+The API address can be changed with the COURSERA_API_URL environment variable, for
+example to point the lookups at a local stub server.
 '''
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import requests
+from requests.adapters import HTTPAdapter
 
-def search_courses(search_terms):
-    # List to store all course results
-    all_courses = [] 
-
-    # Base URL for Coursera API that will be queried for courses
-    url = "https://www.coursera.org/api/courses.v1"
-
-    for term in search_terms:
-        # Define the parameters for the API requestZ
-        params = {
-            "q": "search",
-            "query": term,
-            "includes": "instructor_ids",
-            "limit": 5
-        }
+import course_cache
+
+# Base URL for Coursera API that will be queried for courses
+COURSERA_API_URL = os.environ.get("COURSERA_API_URL", "https://www.coursera.org/api/courses.v1")
+# Course pages always link to the real site
+COURSE_PAGE_URL = "https://www.coursera.org/learn/"
+
+# Lookups running at the same time, also the number of pooled connections
+MAX_CONCURRENT_LOOKUPS = 4
+# Seconds to connect and to wait for the answer of a single lookup
+REQUEST_TIMEOUT = (3, 5)
+# Seconds the whole search waits before returning the courses found so far
+SEARCH_TIMEOUT = 8
+# Courses kept per skill
+COURSES_PER_SKILL = 3
+# Background refreshes running at the same time, and queued or running at most
+REFRESH_WORKERS = 1
+MAX_REFRESHES = 8
+
+# Define the headers for the request to mimic a browser request and avoid blocks
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3',
+    'Referer': 'https://www.coursera.org/'
+}
+
+_lock = threading.Lock()
+_session = None
+_executor = None
+_refresh_executor = None
+# Terms being refreshed in the background by this process
+_refreshing = set()
+
+
+# Shared HTTP session keeping up to MAX_CONCURRENT_LOOKUPS connections alive
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_LOOKUPS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+        return _session
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOOKUPS, thread_name_prefix="coursera")
+        return _executor
+
+
+def _get_refresh_executor():
+    global _refresh_executor
+    with _lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="coursera-refresh")
+        return _refresh_executor
 
-        # Define the headers for the request to mimic a browser request and avoid blocks
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3',
-            'Referer': 'https://www.coursera.org/'
+
+# Courses of a single search term, None when the lookup fails
+def search_term(term, api_url=None, timeout=REQUEST_TIMEOUT):
+    # Define the parameters for the API request
+    params = {
+        "q": "search",
+        "query": term,
+        "includes": "instructor_ids",
+        "limit": 5
+    }
+
+    try:
+        response = get_session().get(api_url or COURSERA_API_URL, params=params, timeout=timeout)
+        if response.status_code != 200:
+            print(f"something went wrong searching coursera for {term}")
+            print(f"Details: status {response.status_code}")
+            return None
+        # Extract the course elements from the response
+        courses = response.json()['elements']
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        print(f"something went wrong searching coursera for {term}")
+        print(f"Details: {e}")
+        return None
+
+    # Append a dictionary with course name and url, limited to the top courses
+    return [
+        {
+            "name": course['name'],
+            "url": f"{COURSE_PAGE_URL}{course['slug']}"
         }
-        response = requests.get(url, params=params, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            # Extract the course elements from the response
-            courses = data['elements']
-
-            # If there are any courses in the response
-            if courses:
-                # Limit to the top 3 courses
-                for course in courses[:3]:
-                    # Append a dictionary with course name and url
-                    all_courses.append({
-                        "name": course['name'],
-                        "url": f"https://www.coursera.org/learn/{course['slug']}"
-                    })
-            else:
-                continue
+        for course in courses[:COURSES_PER_SKILL]
+        if 'name' in course and 'slug' in course
+    ]
+
+
+# Look up a term and store the answer, failed lookups are not cached
+def fetch_term(term, api_url=None, cache_dir=course_cache.COURSE_CACHE_DIR):
+    courses = search_term(term, api_url)
+    if courses is not None and cache_dir is not None:
+        course_cache.put_courses(term, courses, cache_dir)
+    return courses
+
+
+# Refresh a stale term in the background unless it is already queued or too many refreshes are
+def _revalidate(term, api_url, cache_dir):
+    with _lock:
+        # The stale entry keeps being served, a later search queues the refresh again
+        if term in _refreshing or len(_refreshing) >= MAX_REFRESHES:
+            return
+        _refreshing.add(term)
+
+    def refresh():
+        try:
+            fetch_term(term, api_url, cache_dir)
+        finally:
+            with _lock:
+                _refreshing.discard(term)
+
+    _get_refresh_executor().submit(refresh)
+
+
+# Courses of every search term in order, skills that failed or timed out are left out
+def search_courses(search_terms, api_url=None, timeout=SEARCH_TIMEOUT, cache_dir=course_cache.COURSE_CACHE_DIR):
+    # List to store all course results
+    all_courses = []
+
+    # Look up each normalized term once, keeping the order they were given in
+    terms = [term for term in dict.fromkeys(map(course_cache.normalize_term, search_terms)) if term]
+    if not terms:
+        return all_courses
+
+    # Answer from the cache where possible, stale entries are served and refreshed behind the response
+    cached = {}
+    if cache_dir is not None:
+        for term in terms:
+            courses, state = course_cache.get_courses(term, cache_dir)
+            if state is not None:
+                cached[term] = courses
+            if state == "stale":
+                _revalidate(term, api_url, cache_dir)
+
+    executor = _get_executor()
+    futures = {term: executor.submit(fetch_term, term, api_url, cache_dir) for term in terms if term not in cached}
+    # Lookups still running at the deadline finish in the background, bounded by their own timeout,
+    # and those still queued are cancelled so the next search does not wait behind them
+    done, not_done = wait(futures.values(), timeout=timeout)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        print(f"coursera search timed out for {len(not_done)} of {len(futures)} skills")
+
+    for term in terms:
+        if term in cached:
+            all_courses.extend(cached[term])
+        elif futures[term] in done:
+            all_courses.extend(futures[term].result() or [])
     return all_courses
@@ -1,13 +1,17 @@
 
-from flask import Flask, render_template, request, redirect, url_for,session
-from Analysis_Visualisation import load_data, analyse_industry_distribution, create_job_title_bubble_chart,create_salary_variation_chart, skills_comparison,generate_wordcloud,create_salary_growth_chart,create_salary_trend_chart,skill_in_demand
+from flask import Flask, render_template, request, redirect, url_for,session, jsonify
+from Analysis_Visualisation import analyse_industry_distribution, skills_comparison, skill_in_demand
 import resume_skills_extractor
+import resume_jobs
 import os
-import pandas as pd
+import sys
 import Course_Url_Coursera 
-from Data_Analysis import industry_job_trend , industry_general_skills, pull_industry_skills , industry_hiring_trend , skill_match_analysis , match_user_to_job_role, filter_df_by_job_role,industry_job,pull_in_job_trend,  pull_in_hiring_trend , get_job_detail_url
-import threading
-import copy
+from data_analysis import pull_industry_skills , match_user_to_job_role, pull_in_job_trend,  pull_in_hiring_trend , get_job_detail_url
+from dataset_store import get_dataset, get_job_role_data, dataset_version
+import artifact_store
+from role_matcher import get_all_roles_matcher
+from chart_render import PLOTLY_CDN_URL, ensure_plotly_js
+from skill_lexicon import load_lexicon
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
@@ -15,9 +19,41 @@ app.secret_key = os.urandom(24)
 # Uploads folder name
 UPLOAD_FOLDER = 'uploads'  
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-# Data set file path
-file_path = r'Datasets\\sg_job_data_cleaned.csv'
+# Reject request bodies well above the resume limit before they are read, leaving room for the form fields
+app.config['MAX_CONTENT_LENGTH'] = resume_skills_extractor.MAX_RESUME_BYTES + 64 * 1024
+# Seconds the upload request waits for its resume job before showing the processing page
+RESUME_WAIT_SECONDS = 2
+# Builds the analysis artifacts in a separate process, so a missing version never runs in a web worker
+BUILD_COMMAND = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build_artifacts.py'), '--workers', '1']
+
+# Map the shared dataset when the worker starts so the first request does not wait for it
+try:
+    get_dataset()
+except OSError as e:
+    print("something went wrong loading the job dataset, it will be loaded on the first request")
+    print(f"Details: {e}")
+
+# Compile the skill lexicon once, resume uploads then extract skills without reading any skill file
+load_lexicon()
+
+# Serve plotly.js once as a static file instead of inlining it in every chart, None when it could not be written
+PLOTLY_JS_FILE = ensure_plotly_js(app.static_folder)
+
+@app.context_processor
+def inject_plotly_js():
+    if PLOTLY_JS_FILE is None:
+        return {"plotly_js": PLOTLY_CDN_URL}
+    return {"plotly_js": url_for('static', filename=PLOTLY_JS_FILE)}
+
+@app.after_request
+def cache_plotly_js(response):
+    # The file name contains the plotly version, so browsers can keep it for a year
+    if PLOTLY_JS_FILE is not None and request.path.endswith(PLOTLY_JS_FILE):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
 
 industry_list = []
 
@@ -42,29 +78,15 @@ class JobRole:
 
 @app.route('/')
 def Home():
-    # Load the data and make copy of data
-    data = load_data(file_path)
-    data1 = copy.deepcopy(data)
-    data2 = copy.deepcopy(data)
-    data3 = copy.deepcopy(data)
-    
-    # Start the jobs in separate threads
-    thread1 = threading.Thread(target=industry_job, args=(data3,))
-    thread2 = threading.Thread(target=industry_job_trend, args=(data1,))
-    thread3 = threading.Thread(target=industry_hiring_trend, args=(data2,))
-    thread4 = threading.Thread(target=industry_general_skills, args=(data,))
-    
-    thread1.start()
-    thread2.start()
-    thread3.start()
-    thread4.start()
-    
+    # Recompute the industry analysis in the background only if the dataset changed since it was last published
+    artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+
     return render_template('home.html')
 
 @app.route('/industries')
 def Industries():
-    # Load CSV file
-    data = load_data(file_path)
+    # Get the shared dataset
+    data = get_dataset()
     industry_list.clear()
 
     # Count occurrences of each industry (Broader Category)
@@ -86,16 +108,6 @@ def Industries():
     return render_template('industries.html', all_industries=industry_list, total_jobs=total_jobs, 
                            industry_distribution=industry_distribution)
 
-def load_data(file_path):
-    data = pd.read_csv(file_path)
-    return data
-
-def analyse_industry_distribution(data):
-    # Group data by 'Broader Category'
-    industry_distribution = data['Broader Category'].value_counts()
-    total_jobs = len(data)
-    return industry_distribution, total_jobs
-
 # Handle individual industry charts and web page
 @app.route('/industry_details', methods=['POST'])
 def industry_details():
@@ -107,51 +119,40 @@ def industry_details():
     # Find the industry object from industry_list that matches the given title, or return None if not found
     industry = next((ind for ind in industry_list if ind.title == industry_name_orig), None)
 
-    # Load the industry-related data from the specified file path
-    data = load_data(file_path)
-
-    #  --- Calling of Analysis and Visualisation Functions ---
-    job_title_chart = create_job_title_bubble_chart(data, industry_name_orig) # Call the Bubble chart function
-    salary_chart = create_salary_variation_chart(data, industry_name_orig)  # Call the Salary Box chart function
-    salary_trend_chart = create_salary_trend_chart(data, industry_name_orig)  # Call the Salary trend Line chart function
-    salary_growth_chart = create_salary_growth_chart(data, industry_name_orig) # Call the the salary growth chart
-    # --------------------------------------------------------
-
     # find industry general skills
     industry_name = industry_name_orig.replace(" ", "_")
 
-    # Path to the dataset for the specific industry 
-    industry_path = "Datasets/(Final)_past_" + industry_name + ".csv"
+    # pulling of all json data, all from the same published version
+    version = artifact_store.current_version()
 
-    with open(industry_path , encoding='utf-8') as csvfile:
-        df = pd.read_csv(csvfile, index_col=False)
-
-    # analysis for job role skills
-    skill_match_analysis(df,industry_name)
+    #  --- Charts precomputed by build_artifacts ---
+    try:
+        page = artifact_store.read_artifact("industry_page_" + industry_name, version)
+    except FileNotFoundError:
+        # Nothing built for this dataset yet, start a build in the background and ask the user to come back
+        artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+        return "The industry analysis is still being prepared, please try again in a minute.", 503
+    # --------------------------------------------------------
 
-    # pulling of all json data
-    skill_list = pull_industry_skills( industry_name)
-    job_trend_code = pull_in_job_trend(industry_name)
-    hiring_trend_code = pull_in_hiring_trend(industry_name)
+    skill_list = pull_industry_skills( industry_name, version)
+    job_trend_code = pull_in_job_trend(industry_name, version)
+    hiring_trend_code = pull_in_hiring_trend(industry_name, version)
 
     # Generate a list of other industries for the sidebar, limited to 4 items
     other_industries = [ind.title for ind in industry_list if ind.title != industry_name_orig][:4]
     other_industries = other_industries[:4] 
-    
-    # Generate a word cloud visualization based on the industry's job titles
-    wordCloud = generate_wordcloud(industry_name)
 
     return render_template('industry_details.html',  
                            industry=industry, 
                            other_industries=other_industries, 
                            job_trend_fig=job_trend_code,
                            skill_list = skill_list,
-                           wordCloud = wordCloud,
+                           wordCloud = page["wordCloud"],
                            hiring_trend_fig = hiring_trend_code,
-                           salary_growth_chart = salary_growth_chart,
-                           job_title_chart=job_title_chart,
-                           salary_chart=salary_chart,
-                           salary_trend_chart = salary_trend_chart)    
+                           salary_growth_chart = page["salary_growth_chart"],
+                           job_title_chart=page["job_title_chart"],
+                           salary_chart=page["salary_chart"],
+                           salary_trend_chart = page["salary_trend_chart"])    
 
 #show the job roles page with suitable jobs
 @app.route('/job_roles')
@@ -166,53 +167,42 @@ def Job_roles():
     # Check if the industry is available in the session
     if 'industry' in session:
         industry_name = session["industry"]
-        # Replace spaces with underscores in the industry name to match the JSON file path format
+        # Replace spaces with underscores in the industry name to match the artifact name format
         industry_name = industry_name.replace(" ", "_")
-        # Construct the path to the job role skill analysis JSON file for the selected industry
-        path = "analysis/job_role_skill_"+industry_name+".json"
 
     else:
         # If no industry is found in session, redirect the user to the Industries page
         print("no industry")
         return redirect(url_for("Industries"))
 
-    # Open the JSON file that contains job role skill data
-    with open(path) as file:
-        # Load the JSON data into a DataFrame and stack it to get job roles and their associated skills
-        job_role_skill_df = pd.read_json(file, orient="index")
-        job_role_skills_series = job_role_skill_df.stack()
-
-    # Match the user's skills to job roles based on the loaded data
-    match_dict , job_role_skill_dict = match_user_to_job_role(job_role_skills_series, userSkills)
-
-    job_role_list = []
-    print(job_role_skill_dict)
-    # if no match job take the first 6 job roles
-    if len(match_dict) == 0:
-        no_match_list  = list(job_role_skill_dict.items())[:6]
-        
-        # Loop through each job role and add it to the job_role_list with 0% match
-        for job in no_match_list:
-            print(job)
-
-            job_object = JobRole(job[0], job[1],0)
-            job_role_list.append(job_object)
-
-    else:   
-        # If matches are found, add them to the list with the corresponding match percentage
-        for job, percent in match_dict.items():
-            skill_list = job_role_skill_dict[job]
-            job_object = JobRole(job, skill_list,int(percent))
-            job_role_list.append(job_object)
-
-    # Sort by best matching percentage
-    job_role_list.sort(key=lambda x: x.match_percent, reverse=True)
-
-    if len(job_role_list) > 15:
-        job_role_list = job_role_list[:15]
+    # Match the user's skills against the inverted index of the industry's job role skills, best 15 first
+    try:
+        matches = match_user_to_job_role(industry_name, userSkills, 15)
+    except FileNotFoundError:
+        # Nothing built for this dataset yet, start a build in the background and ask the user to come back
+        artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+        return "The job role analysis is still being prepared, please try again in a minute.", 503
+
+    # Each match is (job role, skills, match percentage), a 0% match when none of the skills matched
+    job_role_list = [JobRole(job, skill_list, int(percent)) for job, skill_list, percent in matches or []]
 
     return render_template('job_roles.html', job_role=job_role_list)
 
+# Best matching job roles across every industry as JSON, for the skills in the query or the user's session
+@app.route('/api/role_recommendations')
+def role_recommendations():
+    userSkills = request.args.getlist('skill') or session.get('userSkills', [])
+    k = max(1, min(request.args.get('k', 10, type=int), 50))
+
+    try:
+        matcher = get_all_roles_matcher()
+    except FileNotFoundError:
+        # Nothing built for this dataset yet, start a build in the background and ask the client to retry
+        artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+        return jsonify({"error": "The job role analysis is still being prepared, please try again in a minute."}), 503
+
+    return jsonify({"skills": userSkills, "roles": matcher.top_roles(userSkills, k)})
+
 # Show the individual job page
 @app.route("/job_roles/<job_title>")
 def expanded_job_roles(job_title):
@@ -232,12 +222,16 @@ def expanded_job_roles(job_title):
         # If the industry is not found in the session, redirect the user to the "Industries" page to select an industry
         return redirect(url_for("Industries"))
 
-    with open("Datasets/(Final)_past_"+ industry_name +".csv" , encoding="utf-8") as file:
-        df = pd.read_csv(file, index_col=False)
-        job_df = filter_df_by_job_role(df, job_title)
+    # Take the postings of the job role from the shared dataset, their index labels are the rows of its skill index
+    job_df = get_job_role_data(session["industry"], job_title)
 
     # Compare the user's skills with the skills required for a specific job title in the selected industry
-    skillComparisonChart,skillsLacking , match_skills = skills_comparison(userSkills,job_title, industry_name)
+    try:
+        skillComparisonChart,skillsLacking , match_skills = skills_comparison(userSkills,job_title, industry_name)
+    except FileNotFoundError:
+        # Nothing built for this dataset yet, start a build in the background and ask the user to come back
+        artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+        return "The job role analysis is still being prepared, please try again in a minute.", 503
     # Combine the skills lacking and the matching skills into a total skill set
     total_skill = skillsLacking + match_skills
     # Create a JobRole object with the job title and the combined list of skills
@@ -245,18 +239,46 @@ def expanded_job_roles(job_title):
 
     # Generate a chart that shows the demand for skills in the industry using the job data (job_df)
     skillsDemandChart = skill_in_demand(job_df)
-    # Show the courses link from coursera API
-    urlCourses = Course_Url_Coursera.search_courses(skillsLacking)
-    # Retrieve detailed job data (e.g., job descriptions, requirements, etc.) from the job data (job_df)
-    job_detail_data = get_job_detail_url(job_df)
 
+    # Courses and recent job posts call out to other services, the page fetches them after it has loaded
     return render_template("expanded_job_roles.html" ,
                            job_title = job_title,
                            job_role = job,
-                           courses = urlCourses,
                            chart=skillComparisonChart,
-                            skillsDemand_Chart = skillsDemandChart,
-                           job_detail_data = job_detail_data)
+                            skillsDemand_Chart = skillsDemandChart)
+
+# Coursera courses for the skills the user lacks for a job role as JSON, fetched by the job role page
+@app.route('/api/job_roles/<job_title>/courses')
+def course_recommendations(job_title):
+    if 'industry' not in session:
+        return jsonify({"error": "Select an industry first."}), 400
+
+    # The skills looked up are worked out here, so clients can only make the app search for skills of a job role
+    try:
+        _, skillsLacking, _ = skills_comparison(session.get('userSkills', []), job_title, session["industry"].replace(" ", "_"))
+    except FileNotFoundError:
+        artifact_store.refresh_async(dataset_version(), BUILD_COMMAND)
+        return jsonify({"error": "The job role analysis is still being prepared, please try again in a minute."}), 503
+    except KeyError:
+        return jsonify({"error": "Unknown job role."}), 404
+
+    # Show the courses link from coursera API, a skill that could not be looked up is left out
+    return jsonify({"courses": Course_Url_Coursera.search_courses(skillsLacking)})
+
+# Recent job posts of a job role in the user's industry as JSON, fetched by the job role page
+@app.route('/api/job_roles/<job_title>/jobs')
+def recent_jobs(job_title):
+    if 'industry' not in session:
+        return jsonify({"error": "Select an industry first."}), 400
+
+    # Retrieve detailed job data (e.g., job descriptions, requirements, etc.) from the job data (job_df)
+    job_df = get_job_role_data(session["industry"], job_title)
+    job_detail_data = get_job_detail_url(job_df) or []
+
+    # A missing job URL is NaN in the dataset, which JSON cannot carry
+    jobs = [{"title": job["Job Title"], "skills": job["skills"], "url": job["Job URL"] if isinstance(job["Job URL"], str) else None}
+            for job in job_detail_data]
+    return jsonify({"jobs": jobs})
 
 # Resume upload page
 @app.route('/resume')
@@ -283,15 +305,46 @@ def upload_resume():
     if file.filename == '':
         return redirect(request.url)
     
-    # Save the file
-    pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-    file.save(pdf_path)
-    
-    #get skills 
-    resume_skills_extractor.extract_text_from_pdf(pdf_path)
-    skills_found = resume_skills_extractor.outputSkillsExtracted(5)
-
-    return render_template('edit_resume.html', skills=skills_found)
+    # Read the file into memory for this request only
+    try:
+        data = resume_skills_extractor.read_resume_bytes(file.stream)
+    except ValueError as e:
+        return str(e), 413
+
+    # get the best fitting industry and its skills in the resume process pool, so this worker never parses the PDF itself
+    job = resume_jobs.submit_resume(data)
+    if job is None:
+        return "Too many resumes are being processed right now, please try again in a minute.", 503
+    job_id, future = job
+
+    # Most resumes finish quickly, only show the processing page for the slow ones
+    try:
+        future.result(timeout=RESUME_WAIT_SECONDS)
+    except Exception:
+        pass
+    return redirect(url_for('resume_result', job_id=job_id))
+
+# Status of a resume extraction job as JSON, polled by the processing page
+@app.route('/upload/status/<job_id>')
+def resume_status(job_id):
+    status = resume_jobs.job_status(job_id)
+    if status is None:
+        return jsonify({"status": "unknown"}), 404
+    return jsonify({"status": status["status"], "error": status.get("error")})
+
+# Skills of a finished resume extraction job, or the processing page while it is still running
+@app.route('/upload/result/<job_id>')
+def resume_result(job_id):
+    status = resume_jobs.job_status(job_id)
+    if status is None:
+        return redirect(url_for('Resume'))
+
+    if status["status"] == "pending":
+        return render_template('processing_resume.html', job_id=job_id)
+    if status["status"] == "failed":
+        return f"Your resume could not be processed: {status['error']}. Please try another file.", 422
+
+    return render_template('edit_resume.html', skills=status["skills"], industry=status.get("industry"))
 
 # Edit resume skills page
 @app.route('/add_skills', methods=['POST'])
@@ -305,12 +358,6 @@ def add_skills():
 def update_skills():
     # Update the session with the list of skills submitted by the user from the form
     session['userSkills'] = request.form.getlist('skills')
-    
-    # Remove all resume files once skills are submitted
-    for filename in os.listdir(UPLOAD_FOLDER):
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        if os.path.isfile(file_path):
-            os.remove(file_path)
     return redirect(url_for('Job_roles'))
 
 if __name__ == '__main__':
@@ -0,0 +1,218 @@
+'''
+Versioned store for the precomputed analysis JSON files.
+
+Every version is a directory under analysis/versions named after the content hash of
+the dataset it was computed from. A version is written into a temporary directory,
+renamed into place once it is complete, and only then published by atomically
+replacing the analysis/CURRENT pointer. Readers resolve the current version once and
+read every artifact from that directory, so they never see a half written set.
+
+Builds run in their own process (python build_artifacts.py), from the deploy step or
+started by a web worker that finds no version for the current dataset. A lock file per
+version, created exclusively, lets only one process on the machine build a version at a
+time however many web workers ask for it.
+'''
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+ARTIFACT_ROOT = 'analysis'
+VERSIONS_DIR = os.path.join(ARTIFACT_ROOT, 'versions')
+CURRENT_FILE = os.path.join(ARTIFACT_ROOT, 'CURRENT')
+
+# Number of old versions kept on disk for readers that resolved them earlier
+KEEP_VERSIONS = 3
+# Versions whose artifacts are kept in memory, the least recently read is dropped first
+CACHED_VERSIONS = 2
+# Seconds after which the lock of a build that never finished is taken over
+BUILD_LOCK_TIMEOUT = 15 * 60
+
+_lock = threading.Lock()
+# Build processes started by this process, by version
+_builds = {}
+# version -> {artifact name: content}
+_cache = OrderedDict()
+
+
+# Make numpy scalars produced by pandas serialisable
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Read the version id that readers should currently use, None if nothing is published
+def current_version():
+    try:
+        with open(CURRENT_FILE, encoding='utf-8') as file:
+            version = file.read().strip()
+    except FileNotFoundError:
+        return None
+
+    return version or None
+
+
+# Check whether a version has already been published to disk
+def has_version(version):
+    return os.path.isdir(os.path.join(VERSIONS_DIR, version))
+
+
+# Read one artifact from a version, falling back to the legacy file in analysis/
+def read_artifact(name, version=None):
+    if version is None:
+        version = current_version()
+
+    if version is not None:
+        with _lock:
+            artifacts = _cache.get(version)
+            if artifacts is not None and name in artifacts:
+                _cache.move_to_end(version)
+                return artifacts[name]
+
+        path = os.path.join(VERSIONS_DIR, version, name + '.json')
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                content = json.load(file)
+            # Published versions never change, so they are cached until newer versions push them out
+            with _lock:
+                _cache.setdefault(version, {})[name] = content
+                _cache.move_to_end(version)
+                while len(_cache) > CACHED_VERSIONS:
+                    _cache.popitem(last=False)
+            return content
+
+    # Nothing published for this artifact yet, use the file committed in analysis/
+    with open(os.path.join(ARTIFACT_ROOT, name + '.json'), encoding='utf-8') as file:
+        return json.load(file)
+
+
+# Write a complete set of artifacts as a new version and make it the current one
+def publish_version(version, artifacts, replace=False):
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+
+    # Build the whole version in a temporary directory next to the final one
+    tmp_dir = tempfile.mkdtemp(prefix='.' + version + '-', dir=VERSIONS_DIR)
+    old_dir = None
+    try:
+        for name, content in artifacts.items():
+            with open(os.path.join(tmp_dir, name + '.json'), 'w', encoding='utf-8') as file:
+                json.dump(content, file, default=_json_default)
+
+        # Move an existing copy of this version aside when it is being rebuilt on purpose
+        if replace and has_version(version):
+            old_dir = tempfile.mkdtemp(prefix='.old-' + version + '-', dir=VERSIONS_DIR)
+            os.replace(os.path.join(VERSIONS_DIR, version), os.path.join(old_dir, version))
+            with _lock:
+                _cache.pop(version, None)
+
+        # Rename the finished directory into place, another process may have published it first
+        try:
+            os.rename(tmp_dir, os.path.join(VERSIONS_DIR, version))
+        except OSError:
+            if not has_version(version):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+    set_current(version)
+    prune_versions()
+
+
+# Atomically swap the pointer so readers switch to the given version in one step
+def set_current(version):
+    fd, tmp_pointer = tempfile.mkstemp(prefix='.CURRENT-', dir=ARTIFACT_ROOT)
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        file.write(version)
+    os.replace(tmp_pointer, CURRENT_FILE)
+
+
+# Remove the oldest versions, always keeping the current one
+def prune_versions(keep=KEEP_VERSIONS):
+    current = current_version()
+    versions = [name for name in os.listdir(VERSIONS_DIR) if not name.startswith('.')]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(VERSIONS_DIR, name)), reverse=True)
+
+    for name in versions[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(VERSIONS_DIR, name), ignore_errors=True)
+
+
+def _lock_path(version):
+    return os.path.join(VERSIONS_DIR, '.build-' + version + '.lock')
+
+
+# Whether some process on this machine holds the build lock of a version
+def is_building(version):
+    try:
+        return time.time() - os.path.getmtime(_lock_path(version)) < BUILD_LOCK_TIMEOUT
+    except OSError:
+        return False
+
+
+# Hold the build lock of a version, yields False without waiting when another process holds it
+@contextmanager
+def build_lock(version):
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    path = _lock_path(version)
+
+    # A lock left behind by a build that died long ago is taken over
+    if os.path.exists(path) and not is_building(version):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        yield False
+        return
+
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(str(os.getpid()))
+        yield True
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Start a build of a version in a separate process unless it is current or already being built
+def refresh_async(version, command):
+    if current_version() == version:
+        return False
+
+    # The dataset went back to a version that is still on disk
+    if has_version(version):
+        set_current(version)
+        return False
+
+    if is_building(version):
+        return False
+
+    with _lock:
+        process = _builds.get(version)
+        if process is not None and process.poll() is None:
+            return False
+
+        # The build process takes the lock itself, one started by another worker at the same moment just exits
+        try:
+            _builds[version] = subprocess.Popen(command, start_new_session=True)
+        except OSError as e:
+            print("something went wrong starting the analysis artifact build")
+            print(f"Details: {e}")
+            return False
+    return True
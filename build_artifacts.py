@@ -0,0 +1,109 @@
+'''
+Precomputes every analysis artifact the web app reads and publishes them as one version.
+
+The industry level analysis is computed once, then every industry page (bubble chart,
+salary charts, word cloud and job role skills) is built in a process pool with one
+industry per task. Run this after each scrape:
+
+    python build_artifacts.py --workers 4
+'''
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import artifact_store
+from dataset_store import DATASET_PATH, get_dataset, get_partition_index, get_skill_index, dataset_version
+from data_analysis import build_home_artifacts, skill_match_analysis
+from role_matcher import build_role_skill_matrix
+from Analysis_Visualisation import create_job_title_bubble_chart, create_salary_variation_chart, create_salary_trend_chart, create_salary_growth_chart, generate_wordcloud
+
+
+# Builds all artifacts of a single industry, runs inside a pool worker
+def build_industry_artifacts(dataset_path, industry_name_orig, industry_jobs):
+    # Each worker process loads the dataset once and reuses it for every industry it builds
+    data = get_dataset(dataset_path)
+    partitions = get_partition_index(dataset_path)
+    industry_name = industry_name_orig.replace(" ", "_")
+
+    page = {
+        "job_title_chart": create_job_title_bubble_chart(data, industry_name_orig, partitions),
+        "salary_chart": create_salary_variation_chart(data, industry_name_orig, partitions),
+        "salary_trend_chart": create_salary_trend_chart(data, industry_name_orig, partitions),
+        "salary_growth_chart": create_salary_growth_chart(data, industry_name_orig, partitions),
+        "wordCloud": generate_wordcloud(industry_name, data=industry_jobs),
+    }
+
+    # Top skills per job role, read by the job role pages
+    job_role_skill = skill_match_analysis(industry_name_orig, get_skill_index(dataset_path), partitions)
+    if job_role_skill is None:
+        raise RuntimeError(f"skill match analysis failed for {industry_name_orig}")
+
+    return {
+        "industry_page_" + industry_name: page,
+        "job_role_skill_" + industry_name: job_role_skill,
+    }
+
+
+# Computes the full set of artifacts for the dataset, using a process pool when workers > 1
+def build_all_artifacts(dataset_path=DATASET_PATH, workers=1):
+    data = get_dataset(dataset_path)
+
+    artifacts = build_home_artifacts(data, get_skill_index(dataset_path))
+    if artifacts is None:
+        return None
+
+    industries = list(get_partition_index(dataset_path).industries)
+    industry_jobs = artifacts["industry_Jobs"]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(industries))) as executor:
+            futures = [executor.submit(build_industry_artifacts, dataset_path, industry, industry_jobs)
+                       for industry in industries]
+            for future in futures:
+                artifacts.update(future.result())
+    else:
+        for industry in industries:
+            artifacts.update(build_industry_artifacts(dataset_path, industry, industry_jobs))
+
+    # Every job role of every industry in one matrix for the cross industry recommendations
+    artifacts["role_skill_matrix"] = build_role_skill_matrix(
+        {industry: artifacts["job_role_skill_" + industry.replace(" ", "_")] for industry in industries})
+
+    return artifacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the analysis artifacts of every industry page.")
+    parser.add_argument("--dataset", default=DATASET_PATH, help="path of the cleaned job dataset")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--force", action="store_true", help="rebuild even if this dataset version is already published")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    version = dataset_version(args.dataset)
+
+    if not args.force and artifact_store.current_version() == version:
+        print(f"Artifacts for dataset version {version[:12]} are already published.")
+        return
+
+    # Only one process builds a version at a time, web workers may have started several
+    with artifact_store.build_lock(version) as locked:
+        if not locked:
+            print(f"Artifacts for dataset version {version[:12]} are already being built by another process.")
+            return
+
+        artifacts = build_all_artifacts(args.dataset, args.workers)
+        if artifacts is None:
+            print("Industry analysis failed, nothing was published.")
+            return
+
+        artifact_store.publish_version(version, artifacts, replace=args.force)
+
+    elapsed_time = time.time() - start_time
+    print(f"Published {len(artifacts)} artifacts for dataset version {version[:12]} in {elapsed_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+'''
+Renders plotly figures for the web pages without embedding plotly.js.
+
+Each chart is emitted as a div plus the figure JSON that draws it. The plotly.js
+library itself is written once into the static folder and loaded by the base template.
+When the static folder cannot be written, the page loads the same version from the
+plotly CDN instead.
+'''
+
+import os
+import tempfile
+
+import plotly
+import plotly.io as pio
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+# Static file name of the library, versioned so browsers can cache it indefinitely
+PLOTLY_JS_FILE = f"js/plotly-{plotly.__version__}.min.js"
+# The same bundle on the plotly CDN, used when the static folder is read only
+PLOTLY_CDN_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+# Convert a figure to a div and its figure JSON, the page must already have plotly.js loaded
+def render_chart(fig, div_id=None):
+    return pio.to_html(fig, full_html=False, include_plotlyjs=False, div_id=div_id)
+
+
+# Write the plotly.js bundle that matches the installed plotly version into the static folder,
+# returns its static file name, or None when it could not be written
+def ensure_plotly_js(static_folder):
+    js_path = os.path.join(static_folder, PLOTLY_JS_FILE)
+
+    if not os.path.exists(js_path):
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(js_path), exist_ok=True)
+
+            # Write to a temporary file of this process first, so workers starting together
+            # never mix their writes and a half written bundle is never served
+            fd, tmp_path = tempfile.mkstemp(prefix=".plotly-", suffix=".js", dir=os.path.dirname(js_path))
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(get_plotlyjs())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, js_path)
+
+        except OSError as e:
+            print("something went wrong writing plotly.js to the static folder, using the plotly CDN")
+            print(f"Details: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    return PLOTLY_JS_FILE
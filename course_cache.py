@@ -0,0 +1,131 @@
+'''
+Disk cache of the Coursera courses found for a skill.
+
+Entries are keyed by the normalized search term (lower cased, single spaces), so "SQL"
+and " sql" share one entry. Each entry is a small JSON file holding the courses and the
+time they were fetched. An entry is fresh for COURSE_TTL, or NEGATIVE_TTL when the
+search found no course, and may be served stale for STALE_TTL after that while it is
+looked up again in the background. Failed lookups are never stored.
+
+Entries past their stale time are removed when they are read, and every few writes a
+sweep removes expired entries and then the oldest ones above MAX_CACHE_ENTRIES.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+COURSE_CACHE_DIR = os.path.join('.cache', 'courses')
+# Seconds an entry with courses is fresh
+COURSE_TTL = 24 * 60 * 60
+# Seconds a search that found nothing is remembered
+NEGATIVE_TTL = 60 * 60
+# Seconds an expired entry is still served while it is refreshed
+STALE_TTL = 7 * 24 * 60 * 60
+# Entries kept at most, the oldest are removed first
+MAX_CACHE_ENTRIES = 2000
+# Sweeping costs one stat per entry, so it only runs every few writes
+SWEEP_EVERY = 32
+
+_lock = threading.Lock()
+_writes = 0
+
+
+# Lower cased term with single spaces, the key of its cache entry
+def normalize_term(term):
+    return ' '.join(str(term).lower().split())
+
+
+def _entry_path(term, cache_dir):
+    digest = hashlib.sha256(normalize_term(term).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, digest + '.json')
+
+
+# Courses cached for a term and whether they are "fresh" or "stale", (None, None) on a miss
+def get_courses(term, cache_dir=COURSE_CACHE_DIR, now=None):
+    path = _entry_path(term, cache_dir)
+    try:
+        with open(path, encoding='utf-8') as file:
+            entry = json.load(file)
+        courses = entry['courses']
+        age = (now or time.time()) - entry['fetched']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+    ttl = COURSE_TTL if courses else NEGATIVE_TTL
+    if age < ttl:
+        return courses, "fresh"
+    if age < ttl + STALE_TTL:
+        return courses, "stale"
+
+    # Too old to serve, the entry is removed instead of being kept forever
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return None, None
+
+
+# Store the courses found for a term, an empty list remembers that nothing was found
+def put_courses(term, courses, cache_dir=COURSE_CACHE_DIR, max_entries=MAX_CACHE_ENTRIES):
+    global _writes
+
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _entry_path(term, cache_dir)
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '-', dir=cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump({"term": normalize_term(term), "fetched": time.time(), "courses": courses}, file)
+        os.replace(tmp_path, path)
+        tmp_path = None
+
+        with _lock:
+            _writes += 1
+            sweep_now = _writes % SWEEP_EVERY == 1
+        if sweep_now:
+            sweep(cache_dir, max_entries)
+    except OSError as e:
+        print("something went wrong writing the course cache")
+        print(f"Details: {e}")
+        # A write that failed part way must not leave its temporary file behind
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+# Remove entries too old to be served, then the oldest entries above max_entries
+def sweep(cache_dir=COURSE_CACHE_DIR, max_entries=MAX_CACHE_ENTRIES, now=None):
+    now = now or time.time()
+    with _lock:
+        entries = []
+        for entry in os.scandir(cache_dir):
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            # An entry is written when it is fetched, so its age is the age of the file
+            if now - mtime >= COURSE_TTL + STALE_TTL or (entry.name.startswith('.') and now - mtime >= NEGATIVE_TTL):
+                # Expired entries, and temporary files of writes that never finished
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            elif entry.name.endswith('.json'):
+                entries.append((mtime, entry.path))
+
+        if len(entries) <= max_entries:
+            return
+
+        # Oldest fetch first
+        entries.sort()
+        for _, path in entries[:len(entries) - max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
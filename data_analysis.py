@@ -1,8 +1,10 @@
 import pandas as pd
 import plotly.graph_objects as go
-import ast
 import plotly.express as px
-import json
+from chart_render import render_chart
+from artifact_store import read_artifact
+from role_matcher import get_role_matcher
+from dataset_store import COLD_COLUMNS, get_partition_index, get_rows, get_skill_index
 
 
 #============================================       helper code     =============================================
@@ -24,9 +26,7 @@ def filter_skills(skills_list):
 
 # Extracts the unique 'Broader Category' from the DataFrame, converts it to a string, and replaces spaces with underscores.
 def get_industry_name(df):
-    industry_name = df["Broader Category"].unique()
-    industry_name = str(industry_name)
-    industry_name = industry_name[2:-2]
+    industry_name = str(df["Broader Category"].iloc[0])
     industry_name = industry_name.replace(" ", "_")
     return industry_name
 
@@ -35,7 +35,7 @@ def get_industry_name(df):
 def industry_job_trend(df):
     try:
         # group each industry data by industry and separate to individual industry df
-        industry_df = df.groupby("Broader Category")
+        industry_df = df.groupby("Broader Category", observed=True)
         df_list = [industry_df.get_group(x) for x in industry_df.groups]
 
         json_dict = {}
@@ -61,9 +61,9 @@ def industry_job_trend(df):
             industry_name = get_industry_name(df)
 
             # count number of job per quarter
-            job_per_quarter_count = df.groupby(["Job Title", "Quarter"]).size().to_frame("Count of job per quarter").reset_index()
+            job_per_quarter_count = df.groupby(["Job Title", "Quarter"], observed=True).size().to_frame("Count of job per quarter").reset_index()
             job_per_quarter_count = job_per_quarter_count.sort_values(by="Quarter")
-            job_per_quarter_count = job_per_quarter_count.pivot_table(index="Quarter", columns="Job Title", values="Count of job per quarter", fill_value=0)
+            job_per_quarter_count = job_per_quarter_count.pivot_table(index="Quarter", columns="Job Title", values="Count of job per quarter", fill_value=0, observed=True)
             job_per_quarter_count.reset_index(inplace=True)
 
             # calculate the last 6 quarter difference
@@ -94,33 +94,32 @@ def industry_job_trend(df):
                 yaxis_title="No. of Job",
             )
 
-            # get HTML code and save to JSON
-            html_code = fig.to_html(full_html=False)
+            # get the chart div and add it to the JSON artifact
+            html_code = render_chart(fig)
             json_dict[industry_name] = html_code
 
-        with open("analysis/in_job_trend.json", "w") as file:
-            json.dump(json_dict, file)
+        return json_dict
 
     except Exception as e:
         print("Something went wrong in industry job trend function")
         print(f"Details: {e}")
 
-def pull_in_job_trend(industry):
-    with open("analysis/in_job_trend.json") as file:
-        job_trend = json.load(file)
+def pull_in_job_trend(industry, version=None):
+    job_trend = read_artifact("in_job_trend", version)
 
     html_code = job_trend[industry]
 
     return html_code
 
 # Analyzes the general skills required for each industry by counting the frequency of skills from the provided DataFrame.
-def industry_general_skills(df):
+def industry_general_skills(df, skill_index=None):
     try:
-        # change str type list to actual list
-        df["skills"] = df["skills"].apply(ast.literal_eval)
+        # integer encoded skills, rows are the index labels of the shared dataset
+        if skill_index is None:
+            skill_index = get_skill_index()
 
         # group each industry data by industry and separate to individual industry df
-        df = df.groupby("Broader Category")
+        df = df.groupby("Broader Category", observed=True)
         df_list = [df.get_group(x) for x in df.groups]
         json_dict = {}
 
@@ -128,15 +127,10 @@ def industry_general_skills(df):
 
             industry_name = get_industry_name(df)
 
-            # get frequency count of skills
-            all_skills = df['skills'].explode()
-            total_skill_count = all_skills.value_counts()
+            # get frequency count of skills and extract the top 20 skills for the JSON artifact
+            json_dict[industry_name] = skill_index.top_skills(df.index.to_numpy(), 20)
 
-            # extract the top 20 skills and save to JSON
-            top20_skill_json = total_skill_count.head(20)
-            json_dict[industry_name] = top20_skill_json.to_dict()
-
-        pd.Series(json_dict).to_json("analysis/industry_skills.json", indent=4)
+        return json_dict
 
     except Exception as e:
         print("something went wrong with industry general skills ")
@@ -149,7 +143,9 @@ def industry_job(data):
         result = {}
 
         # Group the data by industry and count job titles
-        grouped_data = data.groupby('Broader Category')['Job Title'].value_counts()
+        grouped_data = data.groupby('Broader Category', observed=True)['Job Title'].value_counts()
+        # categorical job titles also report the titles that never occur in an industry
+        grouped_data = grouped_data[grouped_data > 0]
 
         # Loop through each industry and its job titles
         for (industry, job_title), count in grouped_data.items():
@@ -157,18 +153,15 @@ def industry_job(data):
                 result[industry] = {}
             result[industry][job_title] = count
 
-        # Save the result as a JSON file
-        path = "analysis/industry_Jobs.json"
-        pd.Series(result).to_json(path, indent=4)
+        return result
 
     except Exception as e:
         print("something went wrong in industry job function")
         print(f"Details: {e}")
 
 # Retrieves the top skills for a given industry from a pre-generated JSON file.
-def pull_industry_skills(industry_name):
-    with open("analysis/industry_skills.json") as file:
-        industry_skills = json.load(file)
+def pull_industry_skills(industry_name, version=None):
+    industry_skills = read_artifact("industry_skills", version)
 
     skill_list = []
     data = industry_skills[industry_name]
@@ -182,6 +175,8 @@ def pull_industry_skills(industry_name):
 # Analyzes hiring trends by industry based on job posting dates, generating a median job count for each month and saving the results as HTML for visualization.
 def industry_hiring_trend(df):
     try:
+        # work on a copy of the needed columns so the shared dataset is left untouched
+        df = df[["Broader Category", "Job Posting Date"]].copy()
 
         # setting type to date time format
         df['Job Posting Date'] = pd.to_datetime(df['Job Posting Date'], format="%Y-%m-%d")
@@ -191,7 +186,7 @@ def industry_hiring_trend(df):
         df["Year"] = df["Job Posting Date"].dt.year
 
         # separate different industry to its own df
-        df = df.groupby("Broader Category")
+        df = df.groupby("Broader Category", observed=True)
         df_list = [df.get_group(x) for x in df.groups]
         json_dict ={}
         for df in df_list:
@@ -218,95 +213,99 @@ def industry_hiring_trend(df):
                 yaxis_title="Median No. of Job per Month",
             )
 
-            html_code = fig.to_html(full_html=False)
+            html_code = render_chart(fig)
 
             json_dict[industry_name] = html_code
 
-        with open("analysis/in_hiring_trend.json" , "w") as file:
-            json.dump(json_dict, file, indent=4)
+        return json_dict
 
     except Exception as e:
         print("something went wrong in industry hiring trend")
         print(f"Details: {e}")
 
-def pull_in_hiring_trend(industry):
-    with open("analysis/in_hiring_trend.json" , "r") as file:
-        json_dict = json.load(file)
+def pull_in_hiring_trend(industry, version=None):
+    json_dict = read_artifact("in_hiring_trend", version)
 
     html_code = json_dict[industry]
 
     return html_code
 
-# ============================    Job Role Section      ===============================================================
+# Runs every industry level analysis and returns the results keyed by artifact name, or None if any of them failed
+def build_home_artifacts(df, skill_index=None):
+    artifacts = {
+        "industry_Jobs": industry_job(df),
+        "in_job_trend": industry_job_trend(df),
+        "in_hiring_trend": industry_hiring_trend(df),
+        "industry_skills": industry_general_skills(df, skill_index),
+    }
 
-# Get top 10 job roles skills and save to an analysis file
-def skill_match_analysis(df, industry_name):
-    try:
+    # never publish a version with missing analysis
+    if any(content is None for content in artifacts.values()):
+        return None
 
-        # remove all the job less than 10 rows
-        df["Job Title"] = df["Job Title"].str.upper()
-        job_count = df["Job Title"].value_counts()
-        roles_to_keep = job_count[job_count.values >= 10].index
-        df = df[df["Job Title"].isin(roles_to_keep)].copy()
-        df["Job Title"] = df["Job Title"].str.title()
+    return artifacts
 
-        # get list of unique job title
-        unique_job_list = df["Job Title"].unique()
+# ============================    Job Role Section      ===============================================================
 
-        # set skill list value to list type
-        try:
-            df["skills"] = df["skills"].apply(ast.literal_eval)
-        except:
-            print("alr converted")
+# Get top 10 job roles skills for the job role skill artifact of an industry
+def skill_match_analysis(industry_name_orig, skill_index=None, partitions=None):
+    try:
+        # integer encoded skills and row ranges of the shared dataset
+        if skill_index is None:
+            skill_index = get_skill_index()
+        if partitions is None:
+            partitions = get_partition_index()
+
+        # add up the skills of job titles that only differ in case, each title is one row range
+        job_counts = {}
+        skill_counts = {}
+        for job, start, stop in partitions.title_ranges(industry_name_orig):
+            job = job.upper()
+            job_counts[job] = job_counts.get(job, 0) + stop - start
+            skill_counts[job] = skill_counts.get(job, 0) + skill_index.count_range(start, stop)
 
         json_data = {}
-        for job in unique_job_list:
-            # filter df to only include job with more than 10 rows
-            filtered_df = df[df["Job Title"] == job]
+        for job, count in job_counts.items():
+            # remove all the job less than 10 rows
+            if count < 10:
+                continue
 
-            # get top 10 skill per job role and save to JSON
-            job_skill_series = filtered_df["skills"].explode().value_counts()
-            json_dict = { job : job_skill_series.head(10).to_dict()}
+            # get top 10 skill per job role
+            json_dict = { job.title() : skill_index.top_from_counts(skill_counts[job], 10)}
             json_data.update(json_dict)
 
-        file_path = "analysis/job_role_skill_" + industry_name + ".json"
-        pd.Series(json_data).to_json(file_path, indent=4)
+        return json_data
 
     except Exception as e:
         print("something went wrong in skill match analysis")
         print(f"Details: {e}")
 
-# Matches user skills to job skills and calculates the matching percentage.
-def match_user_to_job_role(job_role_skills_series, user_skill_list):
+# Matches user skills to the job roles of an industry, returns the best k as (role, skills, match percent)
+def match_user_to_job_role(industry_name, user_skill_list, k=15, version=None):
     try:
+        # inverted index of the job role skills, built once per artifact version
+        matcher = get_role_matcher(industry_name, version)
 
-        grouped = job_role_skills_series.groupby(level=0)
-        # convert series to dict key value and skills to list
-        job_role_skill_dict = {key: group.index.get_level_values(1).tolist() for key, group in grouped}
-
-        match_dict = {}
-        # set list to upper to be able to compare
-        user_skill_list = list(map(str.upper, user_skill_list))
+        matches = matcher.top_roles(user_skill_list, k)
+        # if no match job take the first 6 job roles
+        if len(matches) == 0:
+            matches = matcher.first_roles(6)
 
-        for key , value in job_role_skill_dict.items():
-            # convert job role skills to upper and compare to find matching percent
-            value = list(map(str.upper, value))
-            matched_skill = set(value) & set(user_skill_list)
-
-            if matched_skill:
-                # percentage calculated by length of match skills over len of job role skills * 100
-                percentage = (len(matched_skill) / len(set(value))) * 100
-                match_dict[key] = round(percentage)
-
-        return match_dict, job_role_skill_dict
+        return matches
 
+    except FileNotFoundError:
+        # Nothing is published for this dataset yet, the page asks the user to come back
+        raise
     except Exception as e:
         print("something went wrong in match user to job role")
         print(f"Details: {e}")
 
 # Get job urls of the specific job
-def get_job_detail_url(job_df):
+def get_job_detail_url(job_df, skill_index=None):
     try:
+        if skill_index is None:
+            skill_index = get_skill_index()
+
         # find recent job in the past 14 days
         curr_date = pd.to_datetime('today').date()
         job_df['Job Posting Date'] = pd.to_datetime(job_df['Job Posting Date'], format='%Y-%m-%d')
@@ -317,12 +316,20 @@ def get_job_detail_url(job_df):
         if len(filtered_df.index) == 0:
             return None
         elif len(filtered_df.index) > 5:
-            job_detail_data = filtered_df.head(5).to_dict(orient="records")
-            return job_detail_data
+            filtered_df = filtered_df.head(5)
+
+        # read the text columns of these job posts from the mapped dataset
+        text_columns = [column for column in COLD_COLUMNS if column != "skills"]
+        text_df = get_rows(filtered_df.index, text_columns)
+        text_df.index = filtered_df.index
+        filtered_df = filtered_df.join(text_df)
+
+        # decode the skills of each job post back into a list
+        job_detail_data = filtered_df.to_dict(orient= "records")
+        for job, row in zip(job_detail_data, filtered_df.index):
+            job["skills"] = skill_index.skills_of(row)
 
-        else:
-            job_detail_data = filtered_df.to_dict(orient= "records")
-            return job_detail_data
+        return job_detail_data
 
     except Exception as e:
         print("something went wrong in get job detail url")
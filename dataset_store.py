@@ -0,0 +1,338 @@
+'''
+Process-wide store for the cleaned job dataset.
+
+The dataset is parsed once per worker with explicit dtypes and kept in memory, together
+with the integer encoded skills of every posting. Every call to get_dataset() only
+stats the file, and the data is reloaded only when the file's modification time
+changes and its content hash is different.
+
+The processing pipeline also writes the dataset as Parquet next to the CSV, with the
+dtypes and a native list column for the skills. The loaders prefer that file whenever
+it is at least as new as the CSV and fall back to the CSV otherwise.
+
+Web workers do not keep a private pandas copy of the dataset. The first process to see a
+new version writes it once under Datasets/.mapped/<version>/ as an uncompressed Arrow IPC
+file plus NumPy files for the skill index, and every process memory maps those files.
+The numeric, date and categorical columns are handed to pandas without copying, so all
+workers share the same pages. The long text columns stay in the Arrow table and are only
+read for the rows that are shown, through get_rows().
+
+The mapped rows are sorted by industry and job title, so every slice the pages need is a
+contiguous row range looked up in the partition index.
+
+Where the mapped copy cannot be written or opened, such as on a read-only filesystem,
+each process keeps the same table and skill index in its own memory instead.
+'''
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from partition_index import build_partition_index, partition_order
+from skill_index import SkillIndex, build_skill_index, parse_skills
+
+# Data set file path
+DATASET_PATH = os.path.join('Datasets', 'sg_job_data_cleaned.csv')
+COLUMNAR_EXTENSION = '.parquet'
+
+# Explicit column types so pandas does not have to infer them on every load
+NUMERIC_COLUMNS = {
+    'Salary Range (K)': 'float64',
+    'Min Salary (K)': 'float64',
+    'Max Salary (K)': 'float64',
+    'Average Salary (K)': 'float64',
+    'Predicted Industry': 'float64',
+    'Job Minimum Experience': 'float64',
+    'Job Maximum Experience': 'float64',
+}
+CATEGORICAL_COLUMNS = ['Broader Category', 'Job Title', 'Work Type']
+TEXT_COLUMNS = ['Job Id', 'Job Description', 'skills', 'Company', 'Job URL', 'Year-Quarter']
+DATE_COLUMNS = ['Job Posting Date']
+
+# Memory mapped copies of the dataset shared by every worker process
+MAPPED_DIR = os.path.join('Datasets', '.mapped')
+KEEP_MAPPED = 2
+# Bumped whenever the layout of the mapped files changes, so old copies are not reused
+MAPPED_LAYOUT = 'sorted1'
+
+# Columns that stay in the mapped Arrow table instead of the shared DataFrame
+COLD_COLUMNS = ['Job Id', 'Job Description', 'skills', 'Company', 'Job URL']
+
+# Current dataset held by this process
+_lock = threading.Lock()
+_state = {
+    'path': None,
+    'mtime': None,
+    'version': None,
+    'data': None,
+    'skills': None,
+    'table': None,
+    'partitions': None,
+}
+
+
+# Compute the SHA-256 content hash of a file in chunks
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Path of the columnar copy written next to a CSV file
+def columnar_path(file_path):
+    return os.path.splitext(file_path)[0] + COLUMNAR_EXTENSION
+
+
+# Use the columnar copy of a dataset when it exists and is not older than the CSV
+def resolve_dataset_path(file_path=DATASET_PATH):
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        return file_path
+
+    parquet_path = columnar_path(file_path)
+    if os.path.exists(parquet_path):
+        if not os.path.exists(file_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(file_path):
+            return parquet_path
+
+    return file_path
+
+
+# Load the dataset into a typed DataFrame, from Parquet or from CSV
+def load_dataset(file_path=DATASET_PATH):
+    # Parquet already stores the dtypes, parsed dates and the skills as lists
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        return pd.read_parquet(file_path)
+
+    dtypes = {column: 'object' for column in TEXT_COLUMNS}
+    dtypes.update({column: 'category' for column in CATEGORICAL_COLUMNS})
+
+    data = pd.read_csv(file_path, dtype=dtypes, index_col=False)
+
+    # Coerce salaries and experience, invalid values become NaN
+    for column, dtype in NUMERIC_COLUMNS.items():
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], errors='coerce').astype(dtype)
+
+    # Convert 'Job Posting Date' to datetime format, invalid dates become NaT
+    for column in DATE_COLUMNS:
+        data[column] = pd.to_datetime(data[column], errors='coerce')
+
+    # Create 'Year-Quarter' field by converting 'Job Posting Date' to year-quarter format
+    data['Year-Quarter'] = data['Job Posting Date'].dt.to_period('Q').astype(str)
+
+    # Calculate Average Salary for each job title
+    data['Average Salary (K)'] = (data['Min Salary (K)'] + data['Max Salary (K)']) / 2
+
+    return data
+
+
+# Write a typed dataset to Parquet with the skills as a native list column
+def write_columnar(data, parquet_path):
+    data = data.copy()
+    data['skills'] = data['skills'].apply(parse_skills)
+
+    # Write to a temporary file first so readers never load a partial file
+    tmp_path = parquet_path + '.tmp'
+    data.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+
+
+# Convert a cleaned dataset CSV into its columnar copy
+def write_columnar_dataset(file_path=DATASET_PATH):
+    parquet_path = columnar_path(file_path)
+    write_columnar(load_dataset(file_path), parquet_path)
+    return parquet_path
+
+
+# Convert one column to Arrow, numbers and dates keep their raw values so they map back without copying
+def _to_arrow(column):
+    if pd.api.types.is_float_dtype(column.dtype):
+        # from_pandas=False keeps NaN as a value instead of turning it into a null
+        return pa.array(column.to_numpy(), from_pandas=False)
+    if pd.api.types.is_datetime64_dtype(column.dtype):
+        # NaT is stored as its int64 sentinel, which pandas reads back as NaT
+        values = column.to_numpy().astype('datetime64[ns]').view('int64')
+        return pa.array(values, from_pandas=False).view(pa.timestamp('ns'))
+    return pa.array(column, from_pandas=True)
+
+
+# Arrow table of every column of a dataset except the skills
+def _to_table(data):
+    columns = [column for column in data.columns if column != 'skills']
+    return pa.Table.from_arrays([_to_arrow(data[column]) for column in columns], names=columns)
+
+
+# Shared DataFrame of the columns pages read directly, the rest stay in the table
+def _hot_frame(table):
+    hot_columns = [name for name in table.column_names if name not in COLD_COLUMNS]
+    # split_blocks stops pandas from consolidating the columns into new copied blocks
+    return table.select(hot_columns).to_pandas(split_blocks=True)
+
+
+# Parse a dataset file into rows sorted by partition and their skill index
+def prepare_dataset(file_path):
+    data = load_dataset(file_path)
+    order = partition_order(data)
+    # Skill ids keep their order of first appearance in the file, so ties rank as before
+    skills = build_skill_index(data['skills']).take(order)
+    return data.iloc[order].reset_index(drop=True), skills
+
+
+# Directory holding the mapped copy of a dataset version
+def mapped_dir(version):
+    return os.path.join(MAPPED_DIR, version + '.' + MAPPED_LAYOUT)
+
+
+# Write the Arrow table and skill index of a dataset version, skipped if another process already did
+def write_mapped(data, skills, version):
+    target_dir = mapped_dir(version)
+    if os.path.isdir(target_dir):
+        return target_dir
+
+    os.makedirs(MAPPED_DIR, exist_ok=True)
+    table = _to_table(data)
+
+    # Write into a temporary directory so readers never map a partial version
+    tmp_dir = tempfile.mkdtemp(prefix='.' + os.path.basename(target_dir) + '-', dir=MAPPED_DIR)
+    try:
+        with ipc.new_file(os.path.join(tmp_dir, 'columns.arrow'), table.schema) as writer:
+            writer.write_table(table)
+        np.save(os.path.join(tmp_dir, 'skills_offsets.npy'), skills.offsets)
+        np.save(os.path.join(tmp_dir, 'skills_values.npy'), skills.values)
+        with open(os.path.join(tmp_dir, 'skills_vocabulary.json'), 'w', encoding='utf-8') as file:
+            json.dump(skills.vocabulary, file)
+
+        # mkdtemp creates the directory private to its owner, workers may run as another user
+        os.chmod(tmp_dir, 0o755)
+
+        # Another process may have published the same version first, its copy is identical
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            if not os.path.isdir(target_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    prune_mapped(os.path.basename(target_dir))
+    return target_dir
+
+
+# Remove the oldest mapped versions, processes that still map them keep their pages until they reload
+def prune_mapped(current, keep=KEEP_MAPPED):
+    versions = [name for name in os.listdir(MAPPED_DIR) if not name.startswith('.')]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(MAPPED_DIR, name)), reverse=True)
+
+    for name in versions[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(MAPPED_DIR, name), ignore_errors=True)
+
+
+# Map a written version into this process, returns the Arrow table, the shared DataFrame and the skill index
+def open_mapped(version):
+    target_dir = mapped_dir(version)
+
+    table = ipc.open_file(pa.memory_map(os.path.join(target_dir, 'columns.arrow'))).read_all()
+    data = _hot_frame(table)
+
+    with open(os.path.join(target_dir, 'skills_vocabulary.json'), encoding='utf-8') as file:
+        vocabulary = json.load(file)
+    skills = SkillIndex(vocabulary,
+                        np.load(os.path.join(target_dir, 'skills_offsets.npy'), mmap_mode='r'),
+                        np.load(os.path.join(target_dir, 'skills_values.npy'), mmap_mode='r'))
+
+    return table, data, skills
+
+
+# Same as open_mapped for a dataset held in this process only, when no mapped copy can be used
+def open_in_memory(data, skills):
+    table = _to_table(data)
+    return table, _hot_frame(table), skills
+
+
+# Return the shared dataset, reloading it only if the file has changed
+def get_dataset(file_path=DATASET_PATH):
+    file_path = resolve_dataset_path(file_path)
+    mtime = os.stat(file_path).st_mtime_ns
+
+    # Fast path: same file and same modification time
+    if _state['path'] == file_path and _state['mtime'] == mtime:
+        return _state['data']
+
+    with _lock:
+        # Another thread may have reloaded while this one was waiting
+        if _state['path'] == file_path and _state['mtime'] == mtime:
+            return _state['data']
+
+        # The file was touched, only reparse it if the content is different
+        version = file_hash(file_path)
+        if _state['path'] != file_path or _state['version'] != version:
+            prepared = None
+            try:
+                # Only the first process to see this version parses the file, the rest map its copy
+                if not os.path.isdir(mapped_dir(version)):
+                    prepared = prepare_dataset(file_path)
+                    write_mapped(*prepared, version)
+                loaded = open_mapped(version)
+            except OSError as e:
+                # A read-only or full filesystem cannot hold the mapped copy, keep the dataset in this process
+                print("something went wrong mapping the job dataset, it is kept in memory instead")
+                print(f"Details: {e}")
+                loaded = open_in_memory(*(prepared or prepare_dataset(file_path)))
+
+            # Row i of the skill index is row i of the data, which keeps its default RangeIndex
+            _state['table'], _state['data'], _state['skills'] = loaded
+            _state['partitions'] = build_partition_index(_state['data'])
+            _state['version'] = version
+
+        _state['path'] = file_path
+        _state['mtime'] = mtime
+        return _state['data']
+
+
+# Content hash of the dataset file currently held by the store
+def dataset_version(file_path=DATASET_PATH):
+    get_dataset(file_path)
+    return _state['version']
+
+
+# Integer encoded skills of the shared dataset, rows are positions in get_dataset()
+def get_skill_index(file_path=DATASET_PATH):
+    get_dataset(file_path)
+    return _state['skills']
+
+
+# Row ranges of every industry and job title, rows are positions in get_dataset()
+def get_partition_index(file_path=DATASET_PATH):
+    get_dataset(file_path)
+    return _state['partitions']
+
+
+# Rows of one industry of the shared dataset, a view that must not be modified
+def get_industry_data(industry, file_path=DATASET_PATH):
+    data = get_dataset(file_path)
+    start, stop = _state['partitions'].industry_range(industry)
+    return data.iloc[start:stop]
+
+
+# Rows of one job title of an industry, copied so the caller may modify them
+def get_job_role_data(industry, job_title, file_path=DATASET_PATH):
+    data = get_dataset(file_path)
+    start, stop = _state['partitions'].title_range(industry, job_title)
+    return data.iloc[start:stop].copy()
+
+
+# Read the given columns of some rows (positions in get_dataset()) from the mapped table
+def get_rows(rows, columns, file_path=DATASET_PATH):
+    get_dataset(file_path)
+    table = _state['table'].select(columns)
+    return table.take(pa.array(np.asarray(rows, dtype=np.int64))).to_pandas()
@@ -0,0 +1,154 @@
+'''
+Bounded pool of warm headless Chrome drivers for the web scraper.
+
+Starting Chrome is the slowest part of scraping a page, so drivers are kept alive and
+leased to one page at a time instead of being started for every page. Between pages a
+driver is reset (cookies cleared, blank page loaded). A driver is replaced after
+MAX_DRIVER_USES pages, which also rotates its user agent, and straight away when it
+crashed or could not be reset.
+
+Nothing starts when this module is imported: the chromedriver binary is installed on
+the first driver created and Chrome starts when a page first leases a driver.
+'''
+
+import queue
+import threading
+from contextlib import contextmanager
+
+from fake_useragent import UserAgent
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Drivers alive at the same time and pages scraped by a driver before it is replaced
+MAX_DRIVERS = 2
+MAX_DRIVER_USES = 10
+
+_lock = threading.Lock()
+_driver_path = None
+_user_agents = None
+
+
+# Path of the chromedriver binary, installed once per process
+def driver_path():
+    global _driver_path
+    with _lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+        return _driver_path
+
+
+# Random browser user agent, the UserAgent data is only loaded when first needed
+def random_user_agent():
+    global _user_agents
+    with _lock:
+        if _user_agents is None:
+            _user_agents = UserAgent()
+        return _user_agents.random
+
+
+# Function to initialize a new WebDriver instance with a random user-agent
+def create_driver():
+    options = Options()
+    options.add_argument('--headless')  # Run Chromium in headless mode
+    options.add_argument('--disable-gpu')  # Disable GPU acceleration
+    options.add_argument('--no-sandbox')  # Bypass OS security model
+    options.add_argument('--disable-dev-shm-usage')  # Overcome limited resource problems
+    options.add_argument('--window-size=1920x1080')  # Set window size to avoid issues with elements not being visible
+
+    # Set a random user-agent
+    options.add_argument(f'user-agent={random_user_agent()}')
+
+    # Initialize the WebDriver with the specified options
+    return webdriver.Chrome(service=Service(driver_path()), options=options)
+
+
+# Quit a driver, ignoring a browser that is already gone
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print("something went wrong closing a browser")
+        print(f"Details: {e}")
+
+
+# Whether a driver still answers, a crashed browser fails any command
+def is_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+# Clear what a page left behind, False when the driver could not be reset
+def reset_driver(driver):
+    try:
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+        return True
+    except WebDriverException:
+        return False
+
+
+class DriverPool:
+    def __init__(self, size=MAX_DRIVERS, max_uses=MAX_DRIVER_USES, factory=create_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self.factory = factory
+        # Idle drivers as (driver, pages scraped), the most recently used is leased first
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.started = 0
+        self.recycled = 0
+
+    def __repr__(self):
+        return f"DriverPool(size={self.size}, max_uses={self.max_uses}, idle={self._idle.qsize()})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Lease a driver for one page, waiting while all drivers are in use
+    @contextmanager
+    def lease(self):
+        self._slots.acquire()
+        try:
+            try:
+                driver, uses = self._idle.get_nowait()
+            except queue.Empty:
+                driver, uses = self.factory(), 0
+                self.started += 1
+
+            healthy = True
+            try:
+                yield driver
+            except Exception:
+                # The page failed, keep the driver only if the browser itself survived
+                healthy = is_alive(driver)
+                raise
+            finally:
+                self._release(driver, uses + 1, healthy)
+        finally:
+            self._slots.release()
+
+    # Return a driver to the pool, or quit it when it is worn out or broken
+    def _release(self, driver, uses, healthy):
+        if healthy and uses < self.max_uses and reset_driver(driver):
+            self._idle.put((driver, uses))
+            return
+        self.recycled += 1
+        quit_driver(driver)
+
+    # Quit every idle driver
+    def close(self):
+        while True:
+            try:
+                driver, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            quit_driver(driver)
@@ -0,0 +1,100 @@
+'''
+Append-only CSV writer for scraped jobs, shared by every scraper thread.
+
+Jobs are written as soon as they are scraped instead of being collected for the end of
+the run. They are buffered and flushed to disk in batches, every FLUSH_EVERY_JOBS jobs or
+FLUSH_EVERY_SECONDS seconds, and on close. A job is written at most once: its Job Id
+(or its URL when the Id could not be read) is checked against the seen-job index and the
+unflushed batch, and only recorded as seen after its batch is on disk.
+'''
+
+import csv
+import os
+import threading
+import time
+
+from scrape_state import job_key
+
+FLUSH_EVERY_JOBS = 20
+FLUSH_EVERY_SECONDS = 30
+
+
+# Key a job is written once by, its Job Id or else its URL
+def sink_key(job):
+    return job_key(job.get("Job Id")) or job_key(job.get("Job URL"))
+
+
+class JobSink:
+    def __init__(self, path, fieldnames, seen, batch_size=FLUSH_EVERY_JOBS, flush_seconds=FLUSH_EVERY_SECONDS):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.seen = seen
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        self._batch = []
+        self._batch_keys = set()
+        self._flushed = time.monotonic()
+
+        # Write the header row only if the file is being created
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if is_new:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def __repr__(self):
+        return f"JobSink(path={self.path!r}, written={self.written}, skipped={self.skipped})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Queue a job for writing, False when it was written before
+    def write(self, job):
+        with self._lock:
+            key = sink_key(job)
+            if key is not None and (key in self.seen or key in self._batch_keys):
+                self.skipped += 1
+                return False
+
+            self._batch.append(job)
+            if key is not None:
+                self._batch_keys.add(key)
+
+            if len(self._batch) >= self.batch_size or time.monotonic() - self._flushed >= self.flush_seconds:
+                self._flush()
+            return True
+
+    # Write the queued jobs to disk, then record them as seen
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._flushed = time.monotonic()
+        if not self._batch:
+            return
+
+        self._writer.writerows(self._batch)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self.seen.add([job.get("Job Id") for job in self._batch] + [job.get("Job URL") for job in self._batch])
+        self.written += len(self._batch)
+        self._batch = []
+        self._batch_keys = set()
+
+    # Flush the last batch and close the file
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
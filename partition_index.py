@@ -0,0 +1,78 @@
+'''
+Row ranges of every industry and job title in the dataset.
+
+Before the dataset is mapped its rows are sorted so that every industry, and every job
+title inside an industry, is one contiguous block of rows. Industries and job titles
+keep the order in which they first appear in the file, so charts list them exactly as
+before. The index only stores the start and stop row of each block, and a slice of the
+dataset is then data.iloc[start:stop] instead of a boolean mask over every row.
+'''
+
+import numpy as np
+import pandas as pd
+
+
+# Row order that groups the dataset into contiguous (industry, job title) blocks, keeping first appearance order
+def partition_order(data):
+    industry_codes, _ = pd.factorize(data['Broader Category'].astype(str))
+    # Combined key so the same job title in two industries gets two blocks
+    title_keys = data['Broader Category'].astype(str) + '\x1f' + data['Job Title'].astype(str)
+    title_codes, _ = pd.factorize(title_keys)
+
+    # lexsort is stable, so rows inside a block keep their order in the file
+    return np.lexsort((title_codes, industry_codes))
+
+
+# Start and stop rows of every industry and of every job title inside it
+class PartitionIndex:
+    def __init__(self, industries, titles):
+        self.industries = industries
+        self.titles = titles
+
+    def __repr__(self):
+        return f"PartitionIndex(industries={len(self.industries)}, job_titles={sum(map(len, self.titles.values()))})"
+
+    # Row range of an industry, an empty range if it is not in the dataset
+    def industry_range(self, industry):
+        return self.industries.get(industry, (0, 0))
+
+    # (job title, start, stop) of every job title of an industry in order of first appearance
+    def title_ranges(self, industry):
+        return self.titles.get(industry, [])
+
+    # Row range of one job title of an industry, an empty range if there is none
+    def title_range(self, industry, job_title):
+        for title, start, stop in self.title_ranges(industry):
+            if title == job_title:
+                return start, stop
+        return 0, 0
+
+
+# Build the index from a dataset already sorted in partition_order
+def build_partition_index(data):
+    industry_codes, industry_values = pd.factorize(data['Broader Category'])
+    title_codes, title_values = pd.factorize(data['Job Title'])
+
+    # A new block starts wherever the industry or the job title changes
+    changed = (industry_codes[1:] != industry_codes[:-1]) | (title_codes[1:] != title_codes[:-1])
+    starts = np.flatnonzero(np.r_[True, changed]) if len(data) else np.array([], dtype=np.int64)
+    stops = np.r_[starts[1:], len(data)]
+
+    industries = {}
+    titles = {}
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        industry_code = industry_codes[start]
+        title_code = title_codes[start]
+        # Rows without an industry are not part of any page
+        if industry_code < 0:
+            continue
+
+        industry = str(industry_values[industry_code])
+        first, _ = industries.get(industry, (start, stop))
+        industries[industry] = (first, stop)
+
+        # Rows without a job title still belong to their industry's range
+        if title_code >= 0:
+            titles.setdefault(industry, []).append((str(title_values[title_code]), start, stop))
+
+    return PartitionIndex(industries, titles)
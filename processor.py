@@ -33,7 +33,7 @@ import pandas as pd
 import csv
 import os
 import re
-import SplitCSV
+from dataset_store import write_columnar_dataset
 
 # Variables
 
@@ -545,8 +545,9 @@ def main(input_csv_file, output_csv_file):
 
             #remove duplicate rows
             RemoveExtraHeaderRows(output_csv_file)
-            
-            SplitCSV.main()
+
+            # Write the typed Parquet copy that the web app loads, it is sliced by industry in memory
+            write_columnar_dataset(output_csv_file)
 
             print("Extra Data Columns Pruned. Data successfully appended. EXITING...")
     except Exception as e:
@@ -0,0 +1,90 @@
+'''
+Token bucket rate limiter shared by every scraper worker, with one bucket per host.
+
+Each page load takes a token from the bucket of its host, so however many workers run,
+a host never sees more than its rate of requests per second (after a short burst). The
+rate adapts to how the host answers: when the share of failed requests among the last
+few rises above ERROR_THRESHOLD the rate is halved, and while requests succeed it climbs
+back by a small step up to the configured maximum.
+'''
+
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# Share of failed requests, among the last ERROR_WINDOW, above which a host is slowed down
+ERROR_THRESHOLD = 0.2
+ERROR_WINDOW = 20
+# Slowest rate a host is ever brought down to, in requests per second
+MIN_RATE = 0.05
+
+
+# Tokens and recent outcomes of one host
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.outcomes = deque(maxlen=ERROR_WINDOW)
+
+    def __repr__(self):
+        return f"TokenBucket(rate={self.rate:.3f}, tokens={self.tokens:.2f})"
+
+    # Add the tokens earned since the last update
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    def __init__(self, max_rate, burst=1, min_rate=MIN_RATE, increase=None):
+        self.max_rate = max_rate
+        self.burst = burst
+        self.min_rate = min(min_rate, max_rate)
+        # Requests per second added back after each success, a tenth of the maximum by default
+        self.increase = increase if increase is not None else max_rate / 10
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def __repr__(self):
+        return f"RateLimiter(max_rate={self.max_rate}, hosts={len(self._buckets)})"
+
+    # Bucket of the host of a URL, created at the full rate
+    def _bucket(self, url):
+        host = urlparse(url).netloc or url
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.max_rate, self.burst)
+        return bucket
+
+    # Block until a request to the host of the URL is allowed
+    def acquire(self, url):
+        while True:
+            with self._lock:
+                bucket = self._bucket(url)
+                bucket.refill(time.monotonic())
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return
+                wait = (1 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+
+    # Record how a request to the host of the URL went and adapt its rate
+    def record(self, url, ok):
+        with self._lock:
+            bucket = self._bucket(url)
+            bucket.refill(time.monotonic())
+            bucket.outcomes.append(ok)
+            error_rate = bucket.outcomes.count(False) / len(bucket.outcomes)
+
+            if not ok and error_rate > ERROR_THRESHOLD:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+            elif ok and error_rate <= ERROR_THRESHOLD:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    # Current requests per second allowed for the host of a URL
+    def rate(self, url):
+        with self._lock:
+            return self._bucket(url).rate
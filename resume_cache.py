@@ -0,0 +1,97 @@
+'''
+Disk cache of the analysis extracted from a resume (industry, industry hits and skills).
+
+Results are keyed by the SHA-256 of the PDF bytes together with the skill lexicon version
+and the extraction settings, so editing a Skills/*.json file makes every old entry miss.
+Each entry is a small JSON file. Reading an entry refreshes its modification time and the
+least recently used entries are removed once the cache grows past MAX_CACHE_BYTES.
+'''
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+RESUME_CACHE_DIR = os.path.join('.cache', 'resumes')
+MAX_CACHE_BYTES = 20 * 1024 * 1024
+# Scanning the directory costs one stat per entry, so the size is only checked every few writes
+EVICT_EVERY = 32
+
+_lock = threading.Lock()
+_writes = 0
+
+
+# Cache key of a resume for an industry choice (None detects it), page limit and lexicon version
+def resume_key(data, industry_choice, max_pages, lexicon_version):
+    digest = hashlib.sha256(data)
+    digest.update(f"\0{industry_choice}\0{max_pages}\0{lexicon_version}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, key + '.json')
+
+
+# Result cached for a key, None on a miss
+def get_result(key, cache_dir=RESUME_CACHE_DIR):
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, encoding='utf-8') as file:
+            result = json.load(file)
+        # Mark the entry as recently used
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return result
+
+
+# Store the result of a key, then evict the least recently used entries over the size limit
+def put_result(key, result, cache_dir=RESUME_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    global _writes
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + key + '-', dir=cache_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(result, file)
+        os.replace(tmp_path, _entry_path(key, cache_dir))
+
+        with _lock:
+            _writes += 1
+            check_size = _writes % EVICT_EVERY == 1
+        if check_size:
+            evict(cache_dir, max_bytes)
+    except OSError as e:
+        print("something went wrong writing the resume cache")
+        print(f"Details: {e}")
+
+
+# Remove the least recently used entries until the cache fits in max_bytes
+def evict(cache_dir=RESUME_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    with _lock:
+        entries = []
+        total = 0
+        for entry in os.scandir(cache_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        if total <= max_bytes:
+            return
+
+        # Oldest modification time first, a read refreshes it
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
@@ -0,0 +1,253 @@
+'''
+Runs resume extraction in a small process pool so web workers never parse PDFs themselves.
+
+The upload route reads the file into memory, submits it as a job and gets a job id back.
+Each job runs in a pool process with a wall clock limit (an alarm that aborts the parse)
+and a CPU limit (the kernel ends a process stuck outside Python code), and at most
+MAX_PENDING_JOBS jobs wait per web worker. The status of every job is a small JSON file
+named after its id, so any web worker can answer a poll for a job submitted elsewhere.
+The pool process records when it starts a job, so the time limits of a job only count
+from then and not while it waits in the queue.
+
+A job that hits its CPU limit ends its pool process, which breaks the pool and every
+other job in it. The pool is then replaced and the other jobs are run again on the new
+one, only the job that used up its CPU time fails.
+
+Finished results are kept in the resume cache, so uploading the same PDF again completes
+its job at once without using the pool.
+'''
+
+import json
+import os
+import secrets
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import resume_cache
+import resume_skills_extractor
+from skill_lexicon import load_lexicon
+
+# resource only exists on Unix, elsewhere jobs run without a CPU limit
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Pool size and limits of one job
+RESUME_WORKERS = int(os.environ.get("RESUME_WORKERS", 2))
+MAX_PENDING_JOBS = 8
+JOB_TIME_LIMIT = 20
+JOB_CPU_LIMIT = 30
+# Seconds a job may wait in the queue before it counts as lost, enough for every queued job ahead of it
+JOB_QUEUE_LIMIT = MAX_PENDING_JOBS * (JOB_TIME_LIMIT + JOB_CPU_LIMIT)
+# Finished job files are removed after this many seconds
+JOB_TTL = 600
+
+JOBS_DIR = os.path.join(tempfile.gettempdir(), "skillgauge-resume-jobs")
+
+_lock = threading.Lock()
+_executor = None
+_pending = 0
+
+
+# Raised inside a pool process when a job runs past its wall clock limit
+class JobTimeout(TimeoutError):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout("resume extraction ran past its time limit")
+
+
+# Extract the industry and skills of one resume, runs inside a pool process
+def run_resume_job(data, industry_choice=None, max_pages=resume_skills_extractor.MAX_RESUME_PAGES,
+                   time_limit=JOB_TIME_LIMIT, cpu_limit=JOB_CPU_LIMIT, job_id=None, created=None):
+    # Record the start, the time limits of a pending job count from here
+    if job_id is not None:
+        _write_status(job_id, {"status": "pending", "created": created, "started": time.time()})
+
+    # The CPU limit counts from what this pool process has already used, None leaves it off
+    if resource is not None and cpu_limit is not None:
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(used.ru_utime + used.ru_stime) + cpu_limit
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+    # SIGALRM aborts the parse without ending the process, it only exists on Unix
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(time_limit)
+    try:
+        text = resume_skills_extractor.extract_text_from_bytes(data, max_pages)
+        return resume_skills_extractor.analyse_text(text, industry_choice)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+# Path of the status file of a job, None for ids that submit_resume could not have made
+def _job_path(job_id):
+    if not job_id or not all(char.isalnum() or char in "-_" for char in job_id):
+        return None
+    return os.path.join(JOBS_DIR, job_id + ".json")
+
+
+# Atomically replace the status file of a job
+def _write_status(job_id, status):
+    fd, tmp_path = tempfile.mkstemp(prefix="." + job_id + "-", dir=JOBS_DIR)
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(status, file)
+    os.replace(tmp_path, _job_path(job_id))
+
+
+# Remove the status files of jobs older than JOB_TTL
+def prune_jobs(ttl=JOB_TTL):
+    now = time.time()
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > ttl:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=RESUME_WORKERS)
+    return _executor
+
+
+# A process that hit its CPU limit breaks the pool, the next job starts a fresh one
+def _reset_executor(broken):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+# Whether a job ran long enough to have been ended by its CPU limit, read from its status file
+def _used_cpu_limit(job_id):
+    try:
+        with open(_job_path(job_id), encoding="utf-8") as file:
+            status = json.load(file)
+    except (OSError, ValueError):
+        return False
+    started = status.get("started")
+    return started is not None and time.time() - started >= JOB_CPU_LIMIT
+
+
+# Submit a resume for extraction, returns the job id and its future, or None when the queue is full
+def submit_resume(data, industry_choice=None):
+    global _pending
+
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    prune_jobs()
+
+    # A resume seen before with the same lexicon is answered from the cache
+    cache_key = resume_cache.resume_key(data, industry_choice, resume_skills_extractor.MAX_RESUME_PAGES,
+                                        load_lexicon().version)
+    result = resume_cache.get_result(cache_key)
+    if result is not None:
+        job_id = secrets.token_urlsafe(16)
+        _write_status(job_id, {"status": "done", **result})
+        future = Future()
+        future.set_result(result)
+        return job_id, future
+
+    with _lock:
+        if _pending >= MAX_PENDING_JOBS:
+            return None
+        _pending += 1
+
+    job_id = secrets.token_urlsafe(16)
+    created = time.time()
+    _write_status(job_id, {"status": "pending", "created": created})
+    # Completed once the job is done or failed, whichever pool it ends up running on
+    result_future = Future()
+
+    def finish(status, result=None, error=None):
+        global _pending
+        with _lock:
+            _pending -= 1
+        _write_status(job_id, status)
+        if error is None:
+            result_future.set_result(result)
+        else:
+            result_future.set_exception(error)
+
+    def start(retried):
+        with _lock:
+            executor = _get_executor()
+        try:
+            future = executor.submit(run_resume_job, data, industry_choice, job_id=job_id, created=created)
+        except BrokenProcessPool:
+            # The pool broke after the last job finished, start again on a fresh one
+            _reset_executor(executor)
+            with _lock:
+                executor = _get_executor()
+            future = executor.submit(run_resume_job, data, industry_choice, job_id=job_id, created=created)
+        future.add_done_callback(lambda future: finished(future, executor, retried))
+
+    def finished(future, executor, retried):
+        try:
+            result = future.result()
+        except JobTimeout as e:
+            finish({"status": "failed", "error": str(e)}, error=e)
+        except BrokenProcessPool as e:
+            _reset_executor(executor)
+            # Another job broke the pool, this one runs again unless it was the one over its CPU limit
+            if not retried and not _used_cpu_limit(job_id):
+                try:
+                    start(True)
+                    return
+                except Exception as retry_error:
+                    e = retry_error
+            finish({"status": "failed", "error": "resume extraction used too much CPU time"}, error=e)
+        except Exception as e:
+            print("something went wrong extracting skills from a resume")
+            print(f"Details: {e}")
+            finish({"status": "failed", "error": "the resume could not be read"}, error=e)
+        else:
+            resume_cache.put_result(cache_key, result)
+            finish({"status": "done", **result}, result=result)
+
+    try:
+        start(False)
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+
+    return job_id, result_future
+
+
+# Status of a job as {"status": "pending" | "done" | "failed", ...}, None for unknown job ids
+def job_status(job_id):
+    path = _job_path(job_id)
+    if path is None:
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            status = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    # The web worker that ran the job went away before it could record the result, a job
+    # still waiting in the queue is given time for the jobs ahead of it
+    if status["status"] == "pending":
+        if status.get("started") is not None:
+            lost = time.time() - status["started"] > JOB_TIME_LIMIT + JOB_CPU_LIMIT
+        else:
+            lost = time.time() - status["created"] > JOB_QUEUE_LIMIT
+        if lost:
+            return {"status": "failed", "error": "resume extraction did not finish"}
+    return status
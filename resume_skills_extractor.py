@@ -3,101 +3,135 @@ Author: Devin
 Extracts the skills from the resume that the user upload
 '''
 
+import io
 import os
-import json
 import re
 from pdfminer.high_level import extract_text
-
-# Define the list of industry JSON files
-industry_files = [
-    "Skills/engineering_skills.json",
-    "Skills/healthcare_skills.json",
-    "Skills/legal_service_skills.json",
-    "Skills/finance_skills.json",
-    "Skills/tech_skills.json"
+from skill_lexicon import load_lexicon
+
+# Industries that can be chosen for extraction, tags of their Skills/<industry>_skills.json files
+industry_choices = [
+    "engineering",
+    "healthcare",
+    "legal_service",
+    "finance",
+    "tech",
+    "business"
 ]
 
-# Define the general skills JSON file
-general_skills_file = "Skills/general_skills.json"
+# Industry used when a resume matches no industry specific skill, the old fixed choice
+DEFAULT_INDUSTRY = "tech"
+
 file_path = os.path.join('uploads', 'results.txt')
 
+# Limits of a single uploaded resume, larger files are rejected and later pages are not read
+MAX_RESUME_BYTES = 5 * 1024 * 1024
+MAX_RESUME_PAGES = 10
+
+# Read an uploaded file stream into memory, refusing anything over max_bytes
+def read_resume_bytes(stream, max_bytes=MAX_RESUME_BYTES):
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f"The resume is larger than the limit of {max_bytes:,} bytes.")
+    return data
+
+# Lowercase the text and keep only words separated by single spaces
+def clean_text(text):
+    # Convert the extracted text to lowercase for uniformity
+    text = text.lower()
+
+    # Remove punctuation and non-word characters using regex
+    text = re.sub(r'[^\w\s]', ' ', text)
+
+    # Replace multiple spaces with a single space and strip leading/trailing whitespace
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+# Extract the cleaned text of the first pages of a PDF held in memory, ValueError when it is no readable PDF
+def extract_text_from_bytes(data, max_pages=MAX_RESUME_PAGES):
+    try:
+        return clean_text(extract_text(io.BytesIO(data), maxpages=max_pages))
+    except TimeoutError:
+        # A job time limit must stop the extraction, not look like an unreadable resume
+        raise
+    except Exception as e:
+        # An unreadable file fails its job instead of passing as a resume without skills
+        raise ValueError(f"The resume could not be read as a PDF: {e}") from e
+
 # Extract text from PDF and output as TXT file
 def extract_text_from_pdf(pdf_file, output_file=file_path):
     try:
         # Open the PDF file in read-binary mode
         with open(pdf_file, 'rb') as f:
-            # Extract text from the PDF using a library function
-            text = extract_text(f)
-            
-            # Convert the extracted text to lowercase for uniformity
-            text = text.lower()
-            
-            # Remove punctuation and non-word characters using regex
-            text = re.sub(r'[^\w\s]', ' ', text)
-            
-            # Replace multiple spaces with a single space and strip leading/trailing whitespace
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip()
-            
-            # Open the output TXT file in write mode with UTF-8 encoding
-            with open(output_file, 'w', encoding='utf-8') as output:
-                # Write the cleaned text to the output file
-                output.write(text)
+            text = extract_text_from_bytes(f.read())
+
+        # Open the output TXT file in write mode with UTF-8 encoding
+        with open(output_file, 'w', encoding='utf-8') as output:
+            # Write the cleaned text to the output file
+            output.write(text)
     except Exception as e:
         # Print an error message if an exception occurs during the extraction process
         print(f"Error extracting text: {e}")
 
-# Define the function to extract skills from a text file
-def extract_skills_from_text(text, industry_file, general_skills_file):
-    with open(industry_file, "r") as f:
-        industry_skills = json.load(f)
+# Define the function to extract skills from a text, using the lexicon compiled at startup
+def extract_skills_from_text(text, industry, lexicon=None):
+    if lexicon is None:
+        lexicon = load_lexicon()
 
-    with open(general_skills_file, "r") as f:
-        general_skills = json.load(f)
+    # Scan the text once, matching single and multi-word skills and aliases on whole words
+    return lexicon.matcher(industry).find(text)
 
-    # Combine industry-specific and general skills into a single dictionary
-    combined_skills = {**industry_skills, **general_skills}
+# Order the skills found for an industry as its own skills followed by general skills, lower cased
+def order_skills(extracted_skills, industry, lexicon):
+    industry_skills = []
+    general_skills = []
 
-    # Find all words in the input text, converting to lowercase
-    words = re.findall(r'\b\w+\b', text.lower())
-    
-    # Create a set to store unique extracted skills
-    extracted_skills = set()
+    # Append skills into different list
+    for skill in extracted_skills:
+        if lexicon.is_industry_skill(skill, industry):
+            industry_skills.append(skill)
+        else:
+            general_skills.append(skill)
 
-    for word in words:
-        # Check each skill and its aliases in the combined skills dictionary
-        for skill, aliases in combined_skills.items():
-            # If the word matches the skill or any of its aliases, add it to the extracted skills set
-            if word in [skill.lower()] + [alias.lower() for alias in aliases]:
-                extracted_skills.add(skill) 
-                break
+    # Combine industry and general skills, converting them to lowercase
+    return [skills.lower() for skills in industry_skills + general_skills]
 
-    # Return the extracted skills as a list
-    return list(extracted_skills)
+# Scan a text once against every industry's skills, returns the industry, the hits of every industry and its skills
+def analyse_text(text, industry_choice=None, lexicon=None):
+    if lexicon is None:
+        lexicon = load_lexicon()
 
-def outputSkillsExtracted(industry_choice):
-    text_file = file_path
+    found = lexicon.detect(text)
+    industry_hits = {industry: lexicon.industry_hits(skills, industry) for industry, skills in found.items()}
 
-    if not os.path.exists(text_file):
-        print("Text file not found. Please check the file path and try again.")
+    if industry_choice is not None:
+        industry = industry_choices[industry_choice - 1]
     else:
-        with open(text_file, "r") as f:
-            text = f.read()
+        # Most of its own skills wins, ties and resumes without any industry skill go to the default industry
+        industry = max(industry_hits, key=lambda name: (industry_hits[name], name == DEFAULT_INDUSTRY))
 
-        # Extract skills from the text using the selected industry and general skills files
-        industry_file = industry_files[industry_choice - 1]
-        extracted_skills = extract_skills_from_text(text, industry_file, general_skills_file)
+    return {
+        "industry": industry,
+        "industry_hits": industry_hits,
+        "skills": order_skills(found[industry], industry, lexicon),
+    }
 
-        industry_skills = []
-        general_skills = []
+# Skills of a text for a chosen industry, its own skills followed by general skills, lower cased
+def skills_from_text(text, industry_choice):
+    return analyse_text(text, industry_choice)["skills"]
 
-        # Append skills into different list
-        for skill in extracted_skills:
-            if skill in json.load(open(industry_file, "r")):
-                industry_skills.append(skill)
-            else:
-                general_skills.append(skill)
+# Extract the cleaned text and the analysis of an uploaded resume stream without touching the disk
+def extract_resume_skills(stream, industry_choice=None, max_bytes=MAX_RESUME_BYTES, max_pages=MAX_RESUME_PAGES):
+    text = extract_text_from_bytes(read_resume_bytes(stream, max_bytes), max_pages)
+    return text, analyse_text(text, industry_choice)
 
-    # Combine industry and general skills, converting them to lowercase
-    final_skills = [skills.lower() for skills in industry_skills + general_skills]
-    return final_skills
+def outputSkillsExtracted(industry_choice, text_file=file_path):
+    if not os.path.exists(text_file):
+        print("Text file not found. Please check the file path and try again.")
+        return []
+
+    with open(text_file, "r") as f:
+        text = f.read()
+
+    # Extract skills from the text using the selected industry and general skills
+    return skills_from_text(text, industry_choice)
@@ -0,0 +1,172 @@
+'''
+Matches a user's skills against the top skills of every job role of an industry.
+
+The job role skill artifact is turned once into an inverted index from each upper cased
+skill to the roles that list it. Scoring a user then only touches the roles that share
+at least one of the user's skills, and the best roles are taken with a heap instead of
+sorting every role.
+
+For recommendations across industries, build_artifacts also publishes every job role of
+every industry as one sparse role x skill matrix. Scoring a user against all of them is
+then a single sparse matrix-vector product.
+'''
+
+import heapq
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from artifact_store import current_version, read_artifact
+
+_lock = threading.Lock()
+_matchers = {}
+_all_roles = {}
+
+
+# Inverted index of the top skills of every job role of one industry
+class RoleMatcher:
+    def __init__(self, role_skills):
+        # Role names in alphabetical order and their skills as shown on the page
+        self.roles = sorted(role_skills)
+        self.role_skills = [list(role_skills[role]) for role in self.roles]
+        # Skills are compared upper cased and every role is scored on its distinct skills
+        self.role_sizes = [len({skill.upper() for skill in skills}) for skills in self.role_skills]
+
+        self.skill_roles = {}
+        for role_id, skills in enumerate(self.role_skills):
+            for skill in {skill.upper() for skill in skills}:
+                self.skill_roles.setdefault(skill, []).append(role_id)
+
+    def __repr__(self):
+        return f"RoleMatcher(roles={len(self.roles)}, skills={len(self.skill_roles)})"
+
+    # Best k roles as (role, skills, match percent), highest percent first and alphabetical on ties
+    def top_roles(self, user_skills, k=15):
+        hits = {}
+        for skill in {skill.upper() for skill in user_skills}:
+            for role_id in self.skill_roles.get(skill, ()):
+                hits[role_id] = hits.get(role_id, 0) + 1
+
+        # percentage is the number of matched skills over the number of job role skills
+        scored = ((round(hits[role_id] / self.role_sizes[role_id] * 100), -role_id)
+                  for role_id in hits)
+        return [(self.roles[-neg_id], self.role_skills[-neg_id], percent)
+                for percent, neg_id in heapq.nlargest(k, scored)]
+
+    # First k roles in alphabetical order with a 0% match, shown when none of the user's skills match
+    def first_roles(self, k):
+        return [(role, skills, 0) for role, skills in zip(self.roles[:k], self.role_skills[:k])]
+
+
+# Matcher for an industry, built once per published artifact version
+def get_role_matcher(industry_name, version=None):
+    if version is None:
+        version = current_version()
+
+    key = (version, industry_name)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        with _lock:
+            matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = RoleMatcher(read_artifact("job_role_skill_" + industry_name, version))
+                # Matchers of older versions are no longer read
+                for old_key in [old_key for old_key in _matchers if old_key[0] != version]:
+                    del _matchers[old_key]
+                _matchers[key] = matcher
+
+    return matcher
+
+
+# Build the role x skill matrix artifact from the job role skill artifacts of every industry
+def build_role_skill_matrix(industry_role_skills):
+    roles = []
+    skills = []
+    skill_ids = {}
+    indptr = [0]
+    indices = []
+
+    for industry in sorted(industry_role_skills):
+        role_skills = industry_role_skills[industry]
+        for role in sorted(role_skills):
+            # Columns are upper cased skills, spelled as they first appeared
+            row = []
+            for skill in role_skills[role]:
+                key = skill.upper()
+                if key not in skill_ids:
+                    skill_ids[key] = len(skills)
+                    skills.append(skill)
+                row.append(skill_ids[key])
+
+            roles.append({"industry": industry, "job_title": role})
+            # A skill listed twice in different case is one column
+            indices.extend(dict.fromkeys(row))
+            indptr.append(len(indices))
+
+    return {"roles": roles, "skills": skills, "indptr": indptr, "indices": indices}
+
+
+# Sparse role x skill matrix of every job role of every industry
+class AllRolesMatcher:
+    def __init__(self, matrix):
+        self.roles = matrix["roles"]
+        self.skills = matrix["skills"]
+        self.skill_ids = {skill.upper(): skill_id for skill_id, skill in enumerate(self.skills)}
+
+        # Kept next to the matrix so missing skills are listed in the role's own order
+        self.indptr = np.asarray(matrix["indptr"], dtype=np.int64)
+        self.indices = np.asarray(matrix["indices"], dtype=np.int64)
+        # scipy may sort the index arrays it is given in place, so it gets its own copies
+        self.matrix = csr_matrix((np.ones(len(self.indices), dtype=np.int32), self.indices.copy(), self.indptr.copy()),
+                                 shape=(len(self.roles), len(self.skills)))
+        self.role_sizes = np.diff(self.indptr)
+
+    def __repr__(self):
+        return f"AllRolesMatcher(roles={len(self.roles)}, skills={len(self.skills)})"
+
+    # Best k roles as dicts with their industry, match percent and missing skills, highest percent first
+    def top_roles(self, user_skills, k=10):
+        user = np.zeros(len(self.skills), dtype=np.int32)
+        for skill in user_skills:
+            skill_id = self.skill_ids.get(skill.upper())
+            if skill_id is not None:
+                user[skill_id] = 1
+
+        # One sparse product counts the matched skills of every role
+        hits = self.matrix @ user
+        percent = np.zeros(len(self.roles))
+        np.divide(hits * 100, self.role_sizes, out=percent, where=self.role_sizes > 0)
+        percent = np.round(percent).astype(np.int64)
+
+        # Roles without a match are never recommended, ties keep the industry and role order
+        matched = np.flatnonzero(hits)
+        best = heapq.nlargest(k, matched.tolist(), key=lambda role_id: (percent[role_id], -role_id))
+
+        results = []
+        for role_id in best:
+            row = self.indices[self.indptr[role_id]:self.indptr[role_id + 1]]
+            results.append({
+                "industry": self.roles[role_id]["industry"],
+                "job_title": self.roles[role_id]["job_title"],
+                "match_percent": int(percent[role_id]),
+                "missing_skills": [self.skills[skill_id] for skill_id in row if not user[skill_id]],
+            })
+        return results
+
+
+# Matcher over every industry, built once per published artifact version
+def get_all_roles_matcher(version=None):
+    if version is None:
+        version = current_version()
+
+    matcher = _all_roles.get(version)
+    if matcher is None:
+        with _lock:
+            matcher = _all_roles.get(version)
+            if matcher is None:
+                matcher = AllRolesMatcher(read_artifact("role_skill_matrix", version))
+                _all_roles.clear()
+                _all_roles[version] = matcher
+
+    return matcher
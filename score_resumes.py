@@ -0,0 +1,168 @@
+'''
+Scores every PDF resume in a directory against the job roles of all industries.
+
+Text and skills are extracted in a process pool, with the same time limit and result
+cache the web upload uses, and each resume is matched against the published role skill
+matrix. One JSON line per resume is appended to the output file as soon as it is done:
+
+    {"file": "...", "industry": "...", "industry_hits": {...}, "skills": [...],
+     "top_roles": [{"industry", "job_title", "match_percent"}]}
+
+Resumes already in the output file are skipped, so an interrupted run continues where it
+stopped when started again with the same arguments. Resumes that failed (a line with an
+"error") are tried again, and the last line of a file is its result:
+
+    python score_resumes.py resumes/ --output scores.jsonl --workers 4
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import resume_cache
+import resume_skills_extractor
+from artifact_store import current_version
+from resume_jobs import JOB_TIME_LIMIT, run_resume_job
+from role_matcher import get_all_roles_matcher
+from skill_lexicon import load_lexicon
+
+
+# Relative paths of every PDF under a directory, in a stable order
+def find_resumes(directory):
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+    return paths
+
+
+# Files scored successfully by an earlier run, failed files are left to be tried again
+def scored_files(output_path):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    # End a line cut off by an interrupted run, so the next result starts on its own line
+    with open(output_path, 'rb+') as file:
+        if file.seek(0, os.SEEK_END) > 0:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                file.write(b'\n')
+
+    with open(output_path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+                file_name = result["file"]
+            except (ValueError, KeyError):
+                # A line cut off by an interrupted run is scored again
+                continue
+            # A timeout or other failure may pass on the next run
+            if "error" in result:
+                done.discard(file_name)
+            else:
+                done.add(file_name)
+    return done
+
+
+# Extract the skills of one resume file, runs inside a pool process
+def extract_file(directory, relative_path, industry_choice, max_pages, max_bytes, time_limit):
+    try:
+        with open(os.path.join(directory, relative_path), 'rb') as file:
+            data = resume_skills_extractor.read_resume_bytes(file, max_bytes)
+
+        cache_key = resume_cache.resume_key(data, industry_choice, max_pages, load_lexicon().version)
+        result = resume_cache.get_result(cache_key)
+        if result is None:
+            # No CPU limit here, a worker killed by it would break the whole batch
+            result = run_resume_job(data, industry_choice, max_pages, time_limit, cpu_limit=None)
+            resume_cache.put_result(cache_key, result)
+
+        return {"file": relative_path, **result}
+
+    except Exception as e:
+        return {"file": relative_path, "skills": [], "error": str(e) or type(e).__name__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a directory of PDF resumes against every job role.")
+    parser.add_argument("directory", help="directory searched recursively for PDF resumes")
+    parser.add_argument("--output", default="resume_scores.jsonl", help="JSON lines file the results are appended to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--top", type=int, default=5, help="number of job roles kept per resume")
+    parser.add_argument("--industry-choice", type=int, choices=range(1, len(resume_skills_extractor.industry_choices) + 1),
+                        help="fixed skill lexicon for extraction, by default the best fitting industry is detected")
+    parser.add_argument("--max-pages", type=int, default=resume_skills_extractor.MAX_RESUME_PAGES, help="pages read per resume")
+    parser.add_argument("--max-bytes", type=int, default=resume_skills_extractor.MAX_RESUME_BYTES, help="largest resume read")
+    parser.add_argument("--time-limit", type=int, default=JOB_TIME_LIMIT, help="seconds allowed per resume")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    try:
+        matcher = get_all_roles_matcher(current_version())
+    except FileNotFoundError:
+        print("No job role analysis has been published yet, run python build_artifacts.py first.")
+        sys.exit(1)
+
+    # Compile the lexicon once here so the workers only read its cache
+    load_lexicon()
+
+    resumes = find_resumes(args.directory)
+    done = scored_files(args.output)
+    todo = [path for path in resumes if path not in done]
+    print(f"{len(resumes)} resumes found, {len(resumes) - len(todo)} already scored, {len(todo)} to score")
+
+    start_time = time.time()
+    last_report = start_time
+    scored = 0
+    failed = 0
+
+    with open(args.output, 'a', encoding='utf-8') as output, ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pending = set()
+        queue = iter(todo)
+
+        while True:
+            # Keep a bounded number of resumes in flight instead of queueing the whole directory
+            while len(pending) < args.workers * 4:
+                path = next(queue, None)
+                if path is None:
+                    break
+                pending.add(executor.submit(extract_file, args.directory, path, args.industry_choice,
+                                            args.max_pages, args.max_bytes, args.time_limit))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                result["top_roles"] = [
+                    {key: role[key] for key in ("industry", "job_title", "match_percent")}
+                    for role in matcher.top_roles(result["skills"], args.top)
+                ]
+                if "error" in result:
+                    failed += 1
+
+                # One complete line per resume, flushed so an interrupted run loses nothing it reported
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                scored += 1
+
+            now = time.time()
+            if now - last_report >= args.progress_every:
+                rate = scored / (now - start_time)
+                remaining = (len(todo) - scored) / rate if rate else 0
+                print(f"{scored}/{len(todo)} scored, {rate:.1f} resumes/s, about {remaining:.0f} seconds left")
+                last_report = now
+
+    elapsed_time = time.time() - start_time
+    rate = scored / elapsed_time if elapsed_time else 0
+    print(f"Scored {scored} resumes in {elapsed_time:.2f} seconds ({rate:.1f} resumes/s), {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
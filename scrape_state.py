@@ -0,0 +1,133 @@
+'''
+State the web scraper keeps between runs: the jobs it already holds and the progress of
+the current run.
+
+The seen-job index is a text file with one key per line, the Job Id or the URL of every
+job written to the scraped CSV. It is appended to as jobs are written, so the scraper can
+skip a job card it already holds without opening it. The index file lives in a gitignored
+cache, so every load also merges in the keys of the cleaned dataset committed to the repo
+(and of the scraped CSV when it exists). A fresh checkout, such as the scheduled scrape
+workflow, therefore still knows every job the dataset holds.
+
+The checkpoint lists the pages of a run that are finished and written. It is removed
+when the run completes, so finding one at start means the last run stopped part way and
+its finished pages are skipped.
+'''
+
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+SCRAPER_STATE_DIR = os.path.join('.cache', 'scraper')
+SEEN_JOBS_FILE = os.path.join(SCRAPER_STATE_DIR, 'seen_jobs.txt')
+CHECKPOINT_FILE = os.path.join(SCRAPER_STATE_DIR, 'checkpoint.json')
+# Cleaned dataset committed by the scrape workflow, the jobs it holds count as seen
+DATASET_CSV = os.path.join('Datasets', 'sg_job_data_cleaned.csv')
+
+# Job Ids read back through pandas can come out as floats, "2985478544376208.0"
+_FLOAT_ID = re.compile(r'^(\d+)\.0+$')
+
+
+# Key of a Job Id or job URL, URLs lose their query string, fragment and trailing slash
+def job_key(value):
+    if value is None or value != value:
+        # None or a NaN from an empty dataset cell
+        return None
+    value = str(value).strip()
+    if value.lower() == 'nan':
+        return None
+    if '://' in value:
+        parts = urlsplit(value)
+        value = urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip('/'), '', ''))
+    else:
+        # An integer Job Id stored as a float keeps only its digits
+        float_id = _FLOAT_ID.match(value)
+        if float_id:
+            value = float_id.group(1)
+    return value or None
+
+
+# Keys of the jobs in a scraped or cleaned job CSV file
+def keys_from_csv(csv_file):
+    keys = set()
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            for column in ("Job Id", "Job URL"):
+                key = job_key(row.get(column))
+                if key is not None:
+                    keys.add(key)
+    return keys
+
+
+# Persistent set of the Job Ids and URLs already scraped, shared by the scraper threads
+class SeenJobs:
+    def __init__(self, path=SEEN_JOBS_FILE, seed_csvs=()):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = set()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self._keys = {line.strip() for line in file if line.strip()}
+
+        # The index may be missing or behind, the CSVs hold every job written so far
+        for seed_csv in seed_csvs:
+            if os.path.exists(seed_csv):
+                self.add(keys_from_csv(seed_csv))
+
+    def __repr__(self):
+        return f"SeenJobs(jobs={len(self._keys)}, path={self.path!r})"
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, value):
+        key = job_key(value)
+        return key is not None and key in self._keys
+
+    # Remember keys, appending the new ones to the index file
+    def add(self, values):
+        with self._lock:
+            new_keys = []
+            for value in values:
+                key = job_key(value)
+                if key is not None and key not in self._keys:
+                    self._keys.add(key)
+                    new_keys.append(key)
+            if not new_keys:
+                return
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(''.join(key + '\n' for key in new_keys))
+
+
+# Checkpoint of an unfinished run, None when the last run completed
+def load_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+# Atomically replace the checkpoint
+def save_checkpoint(state, path=CHECKPOINT_FILE):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(tmp_path, path)
+
+
+# Remove the checkpoint once a run has completed
+def clear_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
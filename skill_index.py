@@ -0,0 +1,103 @@
+'''
+Integer encoded skills of every job posting.
+
+The skills column of the dataset stores each posting's skills as a stringified Python list.
+It is parsed once when the dataset is loaded into a global skill vocabulary plus two CSR
+style arrays: values holds the skill ids of every posting back to back and offsets marks
+where each posting starts. Counting skills for any set of postings is then a single
+np.bincount over their ids.
+'''
+
+import ast
+
+import numpy as np
+
+
+# Parse one value of the skills column into a list of skills
+def parse_skills(skills):
+    if isinstance(skills, list):
+        return skills
+    # Parquet stores the skills as a native list column, which pandas returns as arrays
+    if isinstance(skills, (tuple, np.ndarray)):
+        return list(skills)
+    if isinstance(skills, str):
+        try:
+            return list(ast.literal_eval(skills))
+        except (ValueError, SyntaxError):
+            return []
+    return []
+
+
+# Skills of every posting stored as int32 ids in offsets + values arrays
+class SkillIndex:
+    def __init__(self, vocabulary, offsets, values):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.values = values
+
+    def __repr__(self):
+        return f"SkillIndex(skills={len(self.vocabulary)}, postings={len(self.offsets) - 1})"
+
+    # Skill ids of the given postings (row positions), or of every posting when rows is None
+    def skill_ids(self, rows=None):
+        if rows is None:
+            return self.values
+
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+
+        # Position of every id to gather: the start of its posting plus its place inside the posting
+        total = int(lengths.sum())
+        first = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - first, lengths) + np.arange(total)
+        return self.values[positions]
+
+    # Number of times every skill occurs in the given postings, indexed by skill id
+    def count(self, rows=None):
+        return np.bincount(self.skill_ids(rows), minlength=len(self.vocabulary))
+
+    # Number of times every skill occurs in a contiguous range of postings
+    def count_range(self, start, stop):
+        ids = self.values[self.offsets[start]:self.offsets[stop]]
+        return np.bincount(ids, minlength=len(self.vocabulary))
+
+    # Most frequent skills of the given postings as {skill: count}, highest count first
+    def top_skills(self, rows=None, n=None):
+        return self.top_from_counts(self.count(rows), n)
+
+    # Convert an array of counts into {skill: count}, highest count first
+    def top_from_counts(self, counts, n=None):
+        order = np.argsort(-counts, kind="stable")
+        order = order[counts[order] > 0]
+        if n is not None:
+            order = order[:n]
+        return {self.vocabulary[skill_id]: int(counts[skill_id]) for skill_id in order}
+
+    # New index holding only the given postings in the given order, the vocabulary is kept
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return SkillIndex(self.vocabulary, offsets, self.skill_ids(rows))
+
+    # Skills of a single posting
+    def skills_of(self, row):
+        ids = self.values[self.offsets[row]:self.offsets[row + 1]]
+        return [self.vocabulary[skill_id] for skill_id in ids]
+
+
+# Build the vocabulary and CSR arrays from the skills column, row i of the column is posting i
+def build_skill_index(skills_column):
+    vocabulary = {}
+    offsets = np.zeros(len(skills_column) + 1, dtype=np.int64)
+    values = []
+
+    for row, skills in enumerate(skills_column):
+        for skill in parse_skills(skills):
+            # Assign ids in order of first appearance
+            values.append(vocabulary.setdefault(skill, len(vocabulary)))
+        offsets[row + 1] = len(values)
+
+    return SkillIndex(list(vocabulary), offsets, np.array(values, dtype=np.int32))
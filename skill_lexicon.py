@@ -0,0 +1,198 @@
+'''
+Skill lexicon compiled once from every Skills/*.json file.
+
+Each file maps a canonical skill to its aliases and is tagged with its industry, the file
+name without "_skills" (engineering, tech, general, ...). The lexicon holds a read-only
+alias -> canonical skill map, the industries of every skill and one compiled matcher per
+industry (its skills plus the general skills), so extracting skills from a resume never
+touches the disk.
+
+Some files store all aliases of a skill as one comma separated string, those are split
+into separate aliases when the files are read.
+
+detect() scans a text once against the aliases of every file, keeping overlapping
+matches, and resolves them per industry exactly as that industry's own matcher would.
+This gives the hit count of every industry and the skills of the best fitting one
+without scanning the text again.
+
+The compiled lexicon is pickled next to the sources and reused while none of the JSON
+files changed, which makes loading it at startup a single file read.
+'''
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+import threading
+from types import MappingProxyType
+
+from skill_matcher import alias_map, alias_words, build_skill_matcher, resolve_aliases, select_aliases
+
+SKILLS_DIR = 'Skills'
+GENERAL_INDUSTRY = 'general'
+# Binary cache of the compiled lexicon, None disables it
+LEXICON_CACHE = os.path.join(SKILLS_DIR, '.lexicon.pickle')
+# Bumped whenever the compiled lexicon changes shape, so older caches are rebuilt
+LEXICON_FORMAT = 4
+
+_lock = threading.Lock()
+_lexicon = None
+
+
+# Read-only lexicon of every skill file
+class SkillLexicon:
+    def __init__(self, industry_skills, version, sources):
+        # {industry: {skill: (aliases)}} in file order
+        self.industry_skills = MappingProxyType({
+            industry: MappingProxyType({skill: tuple(aliases) for skill, aliases in skills.items()})
+            for industry, skills in industry_skills.items()})
+        self.industries = tuple(industry for industry in industry_skills if industry != GENERAL_INDUSTRY)
+        self.version = version
+        self.sources = sources
+        self.format = LEXICON_FORMAT
+
+        skill_industries = {}
+        for industry, skills in industry_skills.items():
+            for skill in skills:
+                skill_industries.setdefault(skill, set()).add(industry)
+
+        # Lower cased alias words joined by single spaces -> canonical skill, over every file
+        all_skills = {}
+        for skills in industry_skills.values():
+            for skill, skill_aliases in skills.items():
+                all_skills.setdefault(skill, []).extend(skill_aliases)
+        self.aliases = MappingProxyType(alias_map(all_skills))
+        self.skill_industries = MappingProxyType({skill: frozenset(industries)
+                                                  for skill, industries in skill_industries.items()})
+
+        # One matcher per industry over its own skills and the general skills, as before
+        general = industry_skills.get(GENERAL_INDUSTRY, {})
+        self.matchers = MappingProxyType({industry: build_skill_matcher({**industry_skills[industry], **general})
+                                          for industry in self.industries})
+        # One matcher over the aliases of every file, for detecting the industry of a text
+        self.all_matcher = build_skill_matcher(all_skills)
+
+    # Mapping proxies cannot be pickled, so the cache stores plain dicts and wraps them again on load
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['industry_skills'] = {industry: dict(skills) for industry, skills in self.industry_skills.items()}
+        for name in ('aliases', 'skill_industries', 'matchers'):
+            state[name] = dict(state[name])
+        return state
+
+    def __setstate__(self, state):
+        state['industry_skills'] = MappingProxyType({industry: MappingProxyType(skills)
+                                                     for industry, skills in state['industry_skills'].items()})
+        for name in ('aliases', 'skill_industries', 'matchers'):
+            state[name] = MappingProxyType(state[name])
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return f"SkillLexicon(industries={len(self.industries)}, aliases={len(self.aliases)}, version={self.version[:12]})"
+
+    # Compiled matcher of an industry's skills and the general skills
+    def matcher(self, industry):
+        return self.matchers[industry]
+
+    # Whether a canonical skill belongs to an industry's own skill file
+    def is_industry_skill(self, skill, industry):
+        return industry in self.skill_industries.get(skill, ())
+
+    # Canonical skill of a name or alias, None if it is not in the lexicon
+    def canonical(self, alias):
+        return self.aliases.get(' '.join(alias_words(alias) or []))
+
+    # Scan a text once, returns the skills of every industry (its own and general skills) in order of occurrence
+    def detect(self, text):
+        # Every hit is kept, each industry then picks the longest of its own aliases, as its own matcher does
+        hits = self.all_matcher.find_hits(text)
+        return {industry: resolve_aliases(select_aliases(hits, self.matchers[industry].aliases),
+                                          self.matchers[industry].aliases)
+                for industry in self.industries}
+
+    # Number of an industry's own skills in a list of skills found for it
+    def industry_hits(self, skills, industry):
+        return sum(1 for skill in skills if self.is_industry_skill(skill, industry))
+
+
+# Industry tag of a skill file, Skills/legal_service_skills.json -> legal_service
+def industry_of(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name[:-len('_skills')] if name.endswith('_skills') else name
+
+
+# Split aliases stored as one comma separated string into separate aliases
+def split_aliases(aliases):
+    return [alias.strip() for value in aliases for alias in value.split(',') if alias.strip()]
+
+
+# Modification time of every skill file
+def source_mtimes(skills_dir=SKILLS_DIR):
+    return {path: os.stat(path).st_mtime_ns for path in sorted(glob.glob(os.path.join(skills_dir, '*.json')))}
+
+
+# Parse every skill file and compile the lexicon
+def build_lexicon(sources):
+    industry_skills = {}
+    # The format is part of the version, results extracted with an older lexicon shape never match
+    digest = hashlib.sha256(f"format {LEXICON_FORMAT}\0".encode('utf-8'))
+
+    for path in sources:
+        with open(path, 'rb') as file:
+            content = file.read()
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0' + content)
+        industry_skills[industry_of(path)] = {skill: split_aliases(aliases)
+                                              for skill, aliases in json.loads(content).items()}
+
+    return SkillLexicon(industry_skills, digest.hexdigest(), sources)
+
+
+# Read the pickled lexicon, None if it is missing, unreadable or older than the sources
+def read_cached_lexicon(cache_path, sources):
+    try:
+        with open(cache_path, 'rb') as file:
+            lexicon = pickle.load(file)
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ImportError):
+        return None
+
+    if not isinstance(lexicon, SkillLexicon) or getattr(lexicon, 'format', None) != LEXICON_FORMAT \
+            or lexicon.sources != sources:
+        return None
+    return lexicon
+
+
+# Pickle the lexicon through a temporary file so other processes never read half of it
+def write_cached_lexicon(cache_path, lexicon):
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(lexicon, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print("something went wrong writing the skill lexicon cache")
+        print(f"Details: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Load the lexicon from its cache or the sources, then keep it for the life of the process
+def load_lexicon(skills_dir=SKILLS_DIR, cache_path=LEXICON_CACHE, reload=False):
+    global _lexicon
+
+    if _lexicon is not None and not reload:
+        return _lexicon
+
+    with _lock:
+        if _lexicon is not None and not reload:
+            return _lexicon
+
+        sources = source_mtimes(skills_dir)
+        lexicon = read_cached_lexicon(cache_path, sources) if cache_path else None
+        if lexicon is None:
+            lexicon = build_lexicon(sources)
+            if cache_path:
+                write_cached_lexicon(cache_path, lexicon)
+
+        _lexicon = lexicon
+        return _lexicon
@@ -0,0 +1,138 @@
+'''
+Finds the skills of a skill lexicon in free text in one pass over its words.
+
+Every skill name and alias is split into lower cased words and inserted into a word
+trie. The text is split into words the same way, and from each word the trie is walked
+for as long as the following words continue an alias, so multi-word aliases such as
+"Structured Query Language" match as well as single words. Aliases only ever match
+whole words, and matches never overlap: at each position the longest alias wins and the
+scan continues after it.
+
+The trie stores the matched alias rather than its skill, so one scan can be resolved
+against several alias -> skill maps, for example one per industry. find_hits() reports
+every alias occurrence, overlapping ones included, and select_aliases() then applies the
+leftmost-longest rule to the aliases of one map only. An alias that only another map
+knows therefore never hides a shorter alias of this one.
+'''
+
+import re
+
+# Words are runs of letters, digits and underscores, the same rule the PDF text cleaning uses
+WORD_PATTERN = re.compile(r'\w+')
+
+# Key marking the end of an alias inside a trie node, it can never be a word
+_ALIAS = ''
+
+
+# Split text or an alias into lower cased words
+def tokenize(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+# Words an alias can be matched on, None if it cannot be matched reliably
+def alias_words(alias):
+    words = tokenize(alias)
+    # "C++" or ".NET" would shrink to a single shorter word that matches unrelated text
+    if len(words) == 1 and re.search(r'[^\w\s]', alias):
+        return None
+    return words or None
+
+
+# Word trie of every alias of a lexicon
+class SkillMatcher:
+    def __init__(self, trie, max_words, aliases):
+        self.trie = trie
+        self.max_words = max_words
+        # Alias words joined by single spaces -> skill
+        self.aliases = aliases
+
+    def __repr__(self):
+        return f"SkillMatcher(aliases={len(self.aliases)}, max_words={self.max_words})"
+
+    # Skills whose name or aliases occur in the text, in order of first occurrence
+    def find(self, text):
+        return resolve_aliases(self.find_aliases(text), self.aliases)
+
+    # Aliases that occur in the text as joined words, in order of first occurrence
+    def find_aliases(self, text):
+        return select_aliases(self.find_hits(text), self.aliases)
+
+    # Every occurrence of an alias as (first word, last word, alias), overlapping ones included, in text order
+    def find_hits(self, text):
+        words = tokenize(text)
+        hits = []
+
+        for start in range(len(words)):
+            node = self.trie
+            # Aliases are at most max_words long, so each word starts a bounded walk
+            for end in range(start, min(start + self.max_words, len(words))):
+                node = node.get(words[end])
+                if node is None:
+                    break
+                alias = node.get(_ALIAS)
+                if alias is not None:
+                    hits.append((start, end, alias))
+
+        return hits
+
+
+# Aliases of a map among the hits of a scan, leftmost-longest and without overlaps, in order of first occurrence
+def select_aliases(hits, aliases):
+    found = {}
+    next_start = 0
+
+    index = 0
+    while index < len(hits):
+        # Hits are ordered by their first word and then by length, keep the longest alias of the map
+        start = hits[index][0]
+        longest = None
+        while index < len(hits) and hits[index][0] == start:
+            if hits[index][2] in aliases:
+                longest = hits[index]
+            index += 1
+
+        # Words inside a match never start another one, so "structured query language"
+        # does not also match "query language"
+        if longest is not None and start >= next_start:
+            found.setdefault(longest[2], None)
+            next_start = longest[1] + 1
+
+    return list(found)
+
+
+# Skills of matched aliases in an alias -> skill map, aliases missing from the map are ignored
+def resolve_aliases(found_aliases, aliases):
+    skills = {}
+    for alias in found_aliases:
+        skill = aliases.get(alias)
+        if skill is not None:
+            skills.setdefault(skill, None)
+    return list(skills)
+
+
+# Alias -> skill map of a {skill: [aliases]} lexicon, an alias shared by two skills belongs to the first one
+def alias_map(skills):
+    aliases = {}
+    for skill, skill_aliases in skills.items():
+        for alias in [skill] + list(skill_aliases):
+            words = alias_words(alias)
+            if words is not None:
+                aliases.setdefault(' '.join(words), skill)
+    return aliases
+
+
+# Compile a {skill: [aliases]} lexicon into a matcher
+def build_skill_matcher(skills):
+    aliases = alias_map(skills)
+    trie = {}
+    max_words = 1
+
+    for alias in aliases:
+        words = alias.split(' ')
+        node = trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node[_ALIAS] = alias
+        max_words = max(max_words, len(words))
+
+    return SkillMatcher(trie, max_words, aliases)
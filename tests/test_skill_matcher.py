@@ -0,0 +1,57 @@
+from skill_matcher import build_skill_matcher
+
+
+def test_longest_alias_wins_and_hides_the_aliases_inside_it():
+    matcher = build_skill_matcher({
+        "SQL": ["Structured Query Language"],
+        "GraphQL": ["Query Language"],
+    })
+
+    assert matcher.find("Expert in structured query language") == ["SQL"]
+
+
+def test_aliases_after_a_match_are_still_found():
+    matcher = build_skill_matcher({
+        "SQL": ["Structured Query Language"],
+        "GraphQL": ["Query Language"],
+    })
+
+    assert matcher.find("structured query language, then a query language") == ["SQL", "GraphQL"]
+
+
+def test_real_lexicon_does_not_report_graphql_inside_sql(tmp_path):
+    from skill_lexicon import load_lexicon
+
+    lexicon = load_lexicon(cache_path=str(tmp_path / "lexicon.pickle"), reload=True)
+    assert "GraphQL" not in lexicon.matcher("tech").find("structured query language")
+
+
+def test_detect_matches_each_industry_matcher_on_cross_industry_aliases():
+    from skill_lexicon import SkillLexicon
+
+    lexicon = SkillLexicon({
+        "tech": {"SQL": ["SQL"], "Oracle Database": ["Database"], "JIRA": ["Agile"]},
+        "business": {"Database Management": ["Database Management"], "Agile Project Management": []},
+        "general": {"Leadership": ["Management"]},
+    }, "test", {})
+
+    for text in ("agile project management and python", "database management with sql"):
+        found = lexicon.detect(text)
+        for industry in lexicon.industries:
+            assert found[industry] == lexicon.matcher(industry).find(text)
+
+    assert lexicon.detect("database management with sql")["tech"] == ["Oracle Database", "Leadership", "SQL"]
+
+
+def test_detect_matches_each_industry_matcher_on_the_real_lexicon(tmp_path):
+    from skill_lexicon import load_lexicon
+
+    lexicon = load_lexicon(cache_path=str(tmp_path / "lexicon.pickle"), reload=True)
+    texts = ["agile project management and python", "database management with sql"]
+    # Every multi-word alias, so each overlaps the shorter aliases of other industries inside it
+    texts.append(" ".join(alias for alias in lexicon.aliases if " " in alias))
+
+    for text in texts:
+        found = lexicon.detect(text)
+        for industry in lexicon.industries:
+            assert found[industry] == lexicon.matcher(industry).find(text)
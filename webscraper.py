@@ -1,70 +1,124 @@
 import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException, ElementClickInterceptedException, TimeoutException
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.proxy import Proxy, ProxyType
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 import random
-from concurrent.futures import ThreadPoolExecutor
-from fake_useragent import UserAgent
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from driver_pool import DriverPool
+from job_sink import JobSink
+from rate_limiter import RateLimiter
+from scrape_state import DATASET_CSV, SeenJobs, clear_checkpoint, load_checkpoint, save_checkpoint
 import time
 import threading
 import os
-import csv
 
 '''
 - Author: Ainsley Cabading
 What's changed with Version 2?
 
 1. Added parallel processing using ThreadPoolExecutor to be able to have up to X threads rotating across a queue of pages based on the page_count set Y.
-2. Added dynamic user agents and random rate-limiting to the scraping functions to prevent the website from reaching the rate limit.
+2. Added dynamic user agents and rate-limiting to the scraping functions to prevent the website from reaching the rate limit.
 3. Added exponential backoff to manage retries in commmunicating with the web server, progressively increasing wait time between retries.
 4. Made the Chromium drivers headless to reduce overhead.
 5. Added time-keeping to roughly track how long it takes for the webscraper to run in full.
 7. Did some housekeeping and documentation on my code as well as made some functions for re-used statements.
 
-Current main() variables in this version you can change:
-1. page_count - Number of pages to scrape
-2. max_workers - Number of threads to run concurrently
-3. industry_input - Industry to scrape job listings from (based on website input)
+Settings in this version you can change through environment variables:
+1. SCRAPER_PAGES - Number of pages to scrape
+2. SCRAPER_WORKERS - Number of threads (and warm browsers) to run concurrently
+3. SCRAPER_RATE - Page loads per second allowed against the website, shared by all threads
+4. SCRAPER_KNOWN_RUN - Job cards in a row already scraped that end the run
+5. SCRAPER_BULK - Set to 0 to click every job card and read each field separately
+
+Page loads of every thread go through one token bucket rate limiter. When too many of the
+recent page loads fail the rate is halved, and it climbs back while they succeed, instead
+of sleeping for fixed random times.
+
+Pages are sorted by posting date, newest first. Job cards whose URL is in the seen-job
+index are skipped without being opened, and once a page shows SCRAPER_KNOWN_RUN known
+cards in a row no further pages are started, since everything after them is older. Each
+finished page is written to the CSV and recorded in a checkpoint, so a run that crashed
+continues with the pages it had not finished. Jobs are streamed to the CSV through a
+sink that writes each Job Id once, in batches, instead of being held until the end.
+
+The cards of a results page are read with one in-page script, and each new job is opened
+straight from its card's link and read with one more script. Only the fields that script
+misses are looked up one by one, and only cards without a link are clicked.
 
 '''
 
-#--------------------INITIALIZATION--------------------
+#--------------------SETTINGS--------------------
+
+SCRAPER_PAGES = int(os.environ.get("SCRAPER_PAGES", 5))
+SCRAPER_WORKERS = int(os.environ.get("SCRAPER_WORKERS", 1))
+SCRAPER_RATE = float(os.environ.get("SCRAPER_RATE", 0.5))
+# Page loads allowed back to back before the rate applies
+SCRAPER_BURST = 2
+SCRAPER_KNOWN_RUN = int(os.environ.get("SCRAPER_KNOWN_RUN", 20))
+SCRAPER_BULK = os.environ.get("SCRAPER_BULK", "1") != "0"
+
+# Results pages, newest postings first
+SEARCH_URL = "https://www.mycareersfuture.gov.sg/search?sortBy=new_posting_date&page="
+
+# Output file and its header row
+SCRAPED_CSV = 'job_listings_scraped.csv'
+CSV_HEADER = ["Job Id", "Job URL", "Job Salary Range", "Job Employment Type", "Job Posting Date", "Job Title", "Job Description", "skills", "Company", "Job Industry", "Job Minimum Experience"]
+
+# CSS selectors of the fields on a job details page, by CSV column
+DETAIL_SELECTORS = {
+    "Job Id": "span[data-testid='job-details-info-job-post-id']",
+    "Job Salary Range": "span[data-testid='salary-range']",
+    "Job Employment Type": "p[data-testid='job-details-info-employment-type']",
+    "Job Posting Date": "span[data-testid='job-details-info-last-posted-date']",
+    "Job Title": "h1[data-testid='job-details-info-job-title']",
+    "Job Description": "div[data-testid='description-content']",
+    "skills": "div[data-testid='multi-pill-button']",
+    "Company": "p[data-testid='company-hire-info']",
+    "Job Industry": "p[data-testid='job-details-info-job-categories']",
+    "Job Minimum Experience": "p[data-testid='job-details-info-min-experience']",
+}
+
+# In-page script returning the index and link of every job card on a results page
+CARDS_SCRIPT = """
+const cards = [];
+for (let index = 0; ; index++) {
+    const card = document.getElementById('job-card-' + index);
+    if (!card) break;
+    const link = card.matches('a[href]') ? card : card.querySelector('a[href]');
+    cards.push({index: index, url: link ? link.href : null});
+}
+return cards;
+"""
 
-# Initialize the UserAgent object
-ua = UserAgent()
+# In-page script returning the text of every field selector on a job details page, null when missing
+DETAILS_SCRIPT = """
+const fields = {};
+for (const [column, selector] of Object.entries(arguments[0])) {
+    const element = document.querySelector(selector);
+    fields[column] = element ? element.innerText : null;
+}
+return fields;
+"""
+
+# Rate limiter shared by every thread, one bucket per website
+limiter = RateLimiter(SCRAPER_RATE, SCRAPER_BURST)
 
 #--------------------FUNCTIONS--------------------
 # Function to wait for an element to be present
 def wait_for_element(driver, by, value, timeout=15):
     return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
 
-# Function to initialize a new WebDriver instance with a random user-agent
-def create_driver():
-    options = Options()
-    options.add_argument('--headless')  # Run Chromium in headless mode
-    options.add_argument('--disable-gpu')  # Disable GPU acceleration
-    options.add_argument('--no-sandbox')  # Bypass OS security model
-    options.add_argument('--disable-dev-shm-usage')  # Overcome limited resource problems
-    options.add_argument('--window-size=1920x1080')  # Set window size to avoid issues with elements not being visible
-    
-    # Set a random user-agent
-    user_agent = ua.random
-    options.add_argument(f'user-agent={user_agent}')
-
-    # Initialize the WebDriver with the specified options
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-    return driver
-
-# Example of using the create_driver function
-driver = create_driver()
+# Functions to navigate through the rate limiter, each one loads a page from the website
+def polite_get(driver, url):
+    limiter.acquire(url)
+    driver.get(url)
 
+def polite_back(driver, url):
+    limiter.acquire(url)
+    driver.back()
 
 # #Function to calculate the exponential backoff delay with optional jitter
 def exponential_backoff(retries, base_delay=2, max_delay=120):
@@ -95,184 +149,183 @@ def scrape_job_info(driver, selector):
         # print(f"[{threading.current_thread().name}] Failed to scrape job info after {max_retries} attempts.")
     return None
 
-# Function to write job listings to a CSV file
-def write_jobs_to_csv(job_list, csv_file):
-    with open(csv_file, mode='a', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=job_list[0].keys())
-
-        writer.writerows(job_list)
-
-# Function to scrape a single page
-def scrape_page(page):
+# Function to read every job card of a results page in one script, [{"index", "url"}] in page order
+def read_cards(driver):
+    # A card without a link has a null url and is opened by clicking it instead
+    return driver.execute_script(CARDS_SCRIPT)
+
+# Function to read every field of the job details page, one script first and a lookup per field it missed
+def read_job_details(driver):
+    # Explicit wait until the job details are found before continuing
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_SELECTORS["Job Title"]))
+    )
+
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_SELECTORS["Job Description"]))
+    )
+
+    job_data = driver.execute_script(DETAILS_SCRIPT, DETAIL_SELECTORS) if SCRAPER_BULK else {}
+    for column, selector in DETAIL_SELECTORS.items():
+        if not job_data.get(column):
+            job_data[column] = scrape_job_info(driver, selector)
+    return job_data
+
+# Function to open a job card by clicking it on the results page, then return to the results page
+def open_card(driver, query_final, counter):
+    job_card_id = f"job-card-{counter}"
+    print(f"[{threading.current_thread().name}] Trying to find job card with ID: {job_card_id}")
+
+    retries = 5
+    while retries > 0:
+        try:
+            card_container = driver.find_element(By.CSS_SELECTOR, "div[data-testid='card-list']")
+            job_card = card_container.find_element(By.ID, job_card_id)
+            print(f"[{threading.current_thread().name}] Job Card {counter} found. Clicking on it.")
+
+            limiter.acquire(query_final)
+            try:
+                job_card.click()
+
+            except ElementClickInterceptedException:
+                print(f"[{threading.current_thread().name}] ElementClickInterceptedException encountered for job card {counter}. Using JavaScript click.")
+                driver.execute_script("arguments[0].click();", job_card)
+
+            print(f"[{threading.current_thread().name}] Currently Searching through: Job-Card-{counter}")
+
+            job_data = read_job_details(driver)
+            job_data["Job URL"] = driver.current_url
+
+            #-----------RELOAD-----------
+            polite_get(driver, query_final)
+
+            # Explicit wait until the card container is found before continuing
+            wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+
+            return job_data
+
+        except StaleElementReferenceException: # Handle StaleElementReferenceException
+            print(f"[{threading.current_thread().name}] StaleElementReferenceException encountered for job card {counter}. Retrying...")
+            limiter.record(query_final, False)
+            retries -= 1
+            if retries == 0:
+                print(f"[{threading.current_thread().name}] Failed to interact with job card {counter} after multiple retries.")
+                polite_back(driver, query_final)
+                wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+                raise
+            else:
+                polite_back(driver, query_final)
+                wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+
+        except (NoSuchElementException, TimeoutException): #Handles NoSuchElementException
+            limiter.record(query_final, False)
+            retries -= 1
+            if retries == 0:
+                print(f"[{threading.current_thread().name}] Failed to find job card {counter} after multiple retries.")
+                polite_back(driver, query_final)
+                wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+                raise
+            else:
+                # The failure slowed the rate limiter down, so the reload waits longer
+                polite_back(driver, query_final) #Reload
+                print(f"[{threading.current_thread().name}] Retries: {retries}. Rate: {limiter.rate(query_final):.2f} pages/s")
+                wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+
+# Function to scrape a single page with a driver leased from the pool
+def scrape_page(page, pool, sink, stop=None):
+    with pool.lease() as driver:
+        return scrape_listing_page(driver, page, sink, stop)
+
+# Function to scrape a single page with a given driver
+def scrape_listing_page(driver, page, sink, stop=None):
     """
     Scrapes job listings from a specified page on the MyCareersFuture website.
     Args:
+        driver: A WebDriver leased from the driver pool, it is reset by the pool afterwards.
         page (int): The page number to scrape.
+        sink (JobSink): Receives each job as soon as it is scraped, cards of jobs in its seen-job index are skipped without being opened.
+        stop (threading.Event): Set when SCRAPER_KNOWN_RUN known cards in a row are found.
     Returns:
-        list: A list of dictionaries, each containing job details such as URL, title, location, employment type, seniority, minimum experience, industry, salary range, description, and required skills.
+        int: The number of new jobs handed to the sink, each a dictionary of job details such as URL, title, location, employment type, seniority, minimum experience, industry, salary range, description, and required skills.
     The function performs the following steps:
-    1. Creates a web driver instance and sets an implicit wait time.
-    2. Constructs the query URL based on user input for the industry and the specified page number.
+    1. Sets an implicit wait time on the driver.
+    2. Constructs the query URL for the specified page number.
     3. Fetches the page using the web driver.
-    4. Checks for any error messages on the page.
-    5. Waits for the job card container to be present on the page.
-    6. Iterates through job cards, extracting job details and storing them in a list.
-    7. Handles various exceptions such as `NoSuchElementException`, `ElementClickInterceptedException`, and `StaleElementReferenceException`.
-    8. Adds random delays to avoid rate-limiting.
-    9. Returns the list of job details.
+    4. Waits for the job card container to be present on the page.
+    5. Reads the id and link of every job card with a single script.
+    6. Skips known jobs, and opens each new job's page by its link (or by clicking its card when it has none).
+    7. Reads all fields of the job page with a single script, looking up only the fields it missed one by one.
+    8. Loads every page through the shared rate limiter and reports failures to it.
+    9. Streams each job to the sink and returns the number of jobs written.
     """
-    # Create a new WebDriver instance with a random user-agent
-    driver = create_driver()
     driver.implicitly_wait(10)  # Set to 10 seconds
 
-    #Take in user input for industry and create query_final based on industry input
-    query_initial = "https://www.mycareersfuture.gov.sg/search?sortBy=relevancy&page="
-    query_final = query_initial + str(page)
+    #Create query_final for the page
+    query_final = SEARCH_URL + str(page)
     print(query_final)
 
     #Fetch page with driver
-    driver.get(query_final)
+    polite_get(driver, query_final)
 
     # Wait for the card container to be present on the page
-    wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
     try:
-        card_container = driver.find_element(By.CSS_SELECTOR, "div[data-testid='card-list']")
-        print(f"[{threading.current_thread().name}] Card container found.")
-    except NoSuchElementException:
-        print(f"[{threading.current_thread().name}] Card container not found.")
-        driver.quit()
-        return []
-
-    job_count = 0
-    job_num = 0
-    all_jobs = []
+        wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+    except TimeoutException:
+        print(f"[{threading.current_thread().name}] Page {page} did not load.")
+        limiter.record(query_final, False)
+        return 0
+
+    cards = read_cards(driver)
+    print(f"[{threading.current_thread().name}] Finished searching. Total job listings found: {len(cards)}")
+
+    job_written = 0
+    known_run = 0
+    # The results page is only open again after a card was clicked
+    on_results_page = True
+
+    for counter, card in enumerate(cards):
+        # Skip jobs already scraped without opening them
+        if card["url"] in sink.seen:
+            known_run += 1
+            print(f"[{threading.current_thread().name}] Job card {counter} already scraped, skipping.")
+            # Postings are newest first, so a run of known jobs means the rest are known too
+            if known_run >= SCRAPER_KNOWN_RUN and stop is not None:
+                stop.set()
+            continue
+        known_run = 0
 
-    while True:
-        try:
-            job_card_id = f"job-card-{job_num}"
-            job_card = card_container.find_element(By.ID, job_card_id)
-            job_count += 1
-            print(f"[{threading.current_thread().name}] Found job card with ID: {job_card_id}")
-            job_num += 1
-        except:
-            print(f"[{threading.current_thread().name}] Finished searching. Total job listings found: {job_count}")
-            break
-
-    for counter in range(0, job_count):
         try:
-            driver.refresh()
-            job_url = job_title = job_location = job_employment_type = job_seniority = job_min_exp = job_industry = job_salary_range = job_desc = job_skills_needed = ""
-            job_card_id = f"job-card-{counter}"
-            print(f"[{threading.current_thread().name}] Trying to find job card with ID: {job_card_id}")
-
-            retries = 5
-            while retries > 0:
-                try:
-                    card_container = driver.find_element(By.CSS_SELECTOR, "div[data-testid='card-list']")
-                    job_card = card_container.find_element(By.ID, job_card_id)
-                    print(f"[{threading.current_thread().name}] Job Card {counter} found. Clicking on it.")
-
-                    try:
-                        job_card.click()
-
-                    except ElementClickInterceptedException:
-                        print(f"[{threading.current_thread().name}] ElementClickInterceptedException encountered for job card {counter}. Using JavaScript click.")
-                        driver.execute_script("arguments[0].click();", job_card)
-
-                    print(f"[{threading.current_thread().name}] Currently Searching through: Job-Card-{counter}")
-
-                    # Explicit wait until the job details are found before continuing
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1[data-testid='job-details-info-job-title']"))
-                    )
-                    
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-testid='description-content']"))
-                    )
-
-                    job_url = driver.current_url
-                    print(f"[{threading.current_thread().name}] Job URL: {job_url}")
-
-                    #-----------EXTRACTION----------
-                    # Add in scrape_job_info
-
-                    job_title = scrape_job_info(driver, "h1[data-testid='job-details-info-job-title']")
-                    job_employment_type = scrape_job_info(driver, "p[data-testid='job-details-info-employment-type']")
-                    job_min_exp = scrape_job_info(driver, "p[data-testid='job-details-info-min-experience']")
-                    job_industry = scrape_job_info(driver, "p[data-testid='job-details-info-job-categories']")
-                    job_salary_range = scrape_job_info(driver, "span[data-testid='salary-range']")
-                    job_desc = scrape_job_info(driver, "div[data-testid='description-content']")
-                    job_skills_needed = scrape_job_info(driver, "div[data-testid='multi-pill-button']")
-                    job_id = scrape_job_info(driver, "span[data-testid='job-details-info-job-post-id']")
-                    job_post_date = scrape_job_info(driver, "span[data-testid='job-details-info-last-posted-date']")
-                    job_company = scrape_job_info(driver, "p[data-testid='company-hire-info']")
-
-                    #-----------STORAGE------------
-
-                    # Store the extracted data into a dictionary
-                    job_data = {
-                        "Job Id": job_id,
-                        "Job URL": job_url,
-                        "Job Salary Range": job_salary_range,
-                        "Job Employment Type": job_employment_type,
-                        "Job Posting Date": job_post_date,
-                        "Job Title": job_title,
-                        "Job Description": job_desc,
-                        "skills": job_skills_needed,
-                        "Company": job_company,
-                        "Job Industry": job_industry,
-                        "Job Minimum Experience": job_min_exp,
-                    }
-    
-                    # Append the job data to the list
-                    all_jobs.append(job_data)
-
-                    # Print statement to confirm the job data has been added
-                    print(f"[{threading.current_thread().name}] Job data added for job-card-{counter}")
-
-                    #-----------RELOAD-----------
-                    driver.get(query_final)
-
-                    # Explicit wait until the card container is found before continuing
+            if card["url"] and SCRAPER_BULK:
+                # Open the job page straight from the card's link, no click or return to the results page
+                polite_get(driver, card["url"])
+                on_results_page = False
+                job_data = read_job_details(driver)
+                job_data["Job URL"] = card["url"]
+            else:
+                if not on_results_page:
+                    polite_get(driver, query_final)
                     wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
-
-                    break
-
-                except StaleElementReferenceException: # Handle StaleElementReferenceException
-                    print(f"[{threading.current_thread().name}] StaleElementReferenceException encountered for job card {counter}. Retrying...")
-                    retries -= 1
-                    if retries == 0:
-                        print(f"[{threading.current_thread().name}] Failed to interact with job card {counter} after multiple retries.")
-                        driver.back()
-                        wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
-                        raise
-                    else:
-                        driver.back()
-                        wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
-
-                except (NoSuchElementException, TimeoutException): #Handles NoSuchElementException
-                    retries -= 1
-                    if retries == 0:
-                        print(f"[{threading.current_thread().name}] Failed to find job card {counter} after multiple retries.")
-                        driver.back()
-                        wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
-                        raise
-                    else:
-                        time.sleep(random.uniform(5, 10))
-                        driver.back() #Reload
-                        delay = exponential_backoff(retries)
-                        print(f"[{threading.current_thread().name}] Retries: {retries}. Delay: {delay}")
-                        time.sleep(delay)
-                        wait_for_element(driver, By.CSS_SELECTOR, "div[data-testid='card-list']", 15)
+                job_data = open_card(driver, query_final, card["index"])
+                on_results_page = True
 
         except Exception as e:
             print(f"[{threading.current_thread().name}] Job card {counter} not found. Exception: {e}")
-            driver.back()
+            limiter.record(query_final, False)
+            # Reload the results page before the next card that has to be clicked
+            on_results_page = False
+            continue
+
+        print(f"[{threading.current_thread().name}] Job URL: {job_data['Job URL']}")
 
-        time.sleep(random.uniform(2, 5))
+        # Stream the job data to the sink in the CSV column order, a job already written is dropped there
+        if sink.write({column: job_data.get(column) for column in CSV_HEADER}):
+            job_written += 1
 
-    driver.quit()
-    return all_jobs
+        # Print statement to confirm the job data has been added
+        print(f"[{threading.current_thread().name}] Job data added for job-card-{counter}")
+        limiter.record(query_final, True)
+
+    return job_written
 
 # Function to check for the error message
 def check_for_error_message(driver):
@@ -294,11 +347,11 @@ def wait_for_element(driver, by, value, timeout=30):
 """
 Main function to scrape job listings from multiple pages concurrently and save the results to a CSV file.
 This function performs the following steps:
-1. Initializes the number of pages to scrape and an empty list to store job listings.
-2. Uses a ThreadPoolExecutor to scrape multiple pages concurrently.
-3. Collects the results from each thread and combines them into a single list.
-4. Converts the list of job listings (dictionaries) into a pandas DataFrame.
-5. Saves the DataFrame to a CSV file named 'job_listings_scraped.csv'.
+1. Loads the seen-job index and the checkpoint of an unfinished run.
+2. Uses a ThreadPoolExecutor to scrape the pages not done yet concurrently.
+3. Streams every scraped job to 'job_listings_scraped.csv' through a JobSink, which writes each Job Id once.
+4. Flushes the sink and records each finished page in the checkpoint, and stops starting pages after a run of known jobs.
+5. Removes the checkpoint once the run has completed.
 
 """
 def main():
@@ -308,78 +361,53 @@ def main():
     start_time = time.time()
     print(start_time)
 
-    page_count = 5  # MUST be same number to avoid the website crashing. All 20 per page need to be done in 1 sessions
-    all_jobs = []  # List to store all job listings
+    page_count = SCRAPER_PAGES  # MUST be same number to avoid the website crashing. All 20 per page need to be done in 1 sessions
+    max_workers = SCRAPER_WORKERS
+    job_total = 0  # Number of job listings written
+
+    # Jobs already in the CSV, and the pages finished by a run that stopped part way
+    seen = SeenJobs(seed_csvs=[DATASET_CSV, SCRAPED_CSV])
+    checkpoint = load_checkpoint() or {"done_pages": []}
+    done_pages = set(checkpoint["done_pages"])
+    if done_pages:
+        print(f"Resuming the last run, {len(done_pages)} pages already done")
+    stop = threading.Event()
+
+    # Use ThreadPoolExecutor to scrape multiple pages concurrently, reusing one warm driver per worker
+    with JobSink(SCRAPED_CSV, CSV_HEADER, seen) as sink, DriverPool(size=max_workers) as pool, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        pages = iter([page for page in range(page_count) if page not in done_pages])
+
+        while True:
+            # Start pages one worker at a time, so none are started after a run of known jobs
+            while not stop.is_set() and len(pending) < max_workers:
+                page = next(pages, None)
+                if page is None:
+                    break
+                pending[executor.submit(scrape_page, page, pool, sink, stop)] = page
+            if not pending:
+                break
 
-    try:
-        # Use ThreadPoolExecutor to scrape multiple pages concurrently
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            futures = [executor.submit(scrape_page, page) for page in range(page_count)]
-            for future in futures:
-                all_jobs.extend(future.result())  # Collect results from each thread
-
-        # Define the header row of the CSV File.
-        header = ["Job Id", "Job URL", "Job Salary Range", "Job Employment Type", "Job Posting Date", "Job Title", "Job Description", "skills", "Company", "Job Industry", "Job Minimum Experience"]
-
-        # Check if the CSV file already exists
-        file_exists = os.path.isfile('job_listings_scraped.csv')
-
-        # Convert all_jobs to a DataFrame
-        # df = pd.DataFrame(all_jobs)
-        
-        # Write the DataFrame to a CSV file
-        #df.to_csv('job_listings_scraped.csv', mode='a' if file_exists else 'w', header=not file_exists, index=False, encoding='utf-8')
-        # df.to_csv('job_listings_TEST.csv', mode='w', header=True, index=False, encoding='utf-8')
-
-        # Check if the CSV file already exists
-        file_exists = os.path.isfile('job_listings_scraped.csv')
-
-        # Open the CSV file in append mode if it exists, otherwise in write mode
-        with open('job_listings_scraped.csv', 'a' if file_exists else 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=header)
-            # Write the header row only if the file is being created
-            if not file_exists:
-                writer.writeheader()
-
-            # Write accumulated job data to CSV
-            write_jobs_to_csv(all_jobs, 'job_listings_scraped.csv')
-    
-    except TimeoutException:
-        # # Check if the CSV file already exists
-        # file_exists = os.path.isfile('job_listings_scraped.csv')
-
-        # # Convert all_jobs to a DataFrame
-        # df = pd.DataFrame(all_jobs)
-        
-        # # Write the DataFrame to a CSV file
-        # df.to_csv('job_listings_scraped.csv', mode='a' if file_exists else 'w', header=not file_exists, index=False, encoding='utf-8')
-
-        # Check if the CSV file already exists
-        file_exists = os.path.isfile('job_listings_scraped.csv')
-
-        # Open the CSV file in append mode if it exists, otherwise in write mode
-        with open('job_listings_scraped.csv', 'a' if file_exists else 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=header)
-            # Write the header row only if the file is being created
-            if not file_exists:
-                writer.writeheader()
-
-            # Write accumulated job data to CSV
-            write_jobs_to_csv(all_jobs, 'job_listings_scraped.csv')
-
-    finally:
-        # Check if the CSV file already exists
-        file_exists = os.path.isfile('job_listings_scraped.csv')
-
-        # Open the CSV file in append mode if it exists, otherwise in write mode
-        with open('job_listings_scraped.csv', 'a' if file_exists else 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=header)
-            # Write the header row only if the file is being created
-            if not file_exists:
-                writer.writeheader()
-
-            # Write accumulated job data to CSV
-            write_jobs_to_csv(all_jobs, 'job_listings_scraped.csv')
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                page = pending.pop(future)
+                try:
+                    job_total += future.result()
+                except Exception as e:
+                    print(f"something went wrong scraping page {page}, it will be scraped again next run")
+                    print(f"Details: {e}")
+                    continue
+
+                # Put the page's jobs on disk before recording it, so a crash never skips unwritten jobs
+                sink.flush()
+                done_pages.add(page)
+                save_checkpoint({"done_pages": sorted(done_pages)})
+
+    if stop.is_set():
+        print(f"Stopped after {SCRAPER_KNOWN_RUN} known jobs in a row")
+    # The run completed, the next one starts from the first page again
+    clear_checkpoint()
 
     #Save end time
     end_time = time.time()
@@ -394,7 +422,7 @@ def main():
     # Print time taken to run the webscraper
     print(f"Time taken to run the webscraper: {int(minutes)} minutes and {seconds:.2f} seconds")
 
-    print(len(all_jobs))
+    print(job_total)
 
 if __name__ == "__main__":
     main()